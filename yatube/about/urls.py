@@ -1,10 +1,16 @@
 from django.urls import path
 
+from posts.conditional import conditional_page, static_scopes
+
 from . import views
 
 app_name = 'about'
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech'),
+    path('author/',
+         conditional_page(static_scopes)(views.AboutAuthorView.as_view()),
+         name='author'),
+    path('tech/',
+         conditional_page(static_scopes)(views.AboutTechView.as_view()),
+         name='tech'),
 ]
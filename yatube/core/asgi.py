@@ -0,0 +1,34 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import set_urlconf
+
+
+def asgi_urlconf():
+    return getattr(settings, 'ASGI_ROOT_URLCONF', settings.ROOT_URLCONF)
+
+
+class ASGIURLconfMiddleware:
+    """Resolve the requests served through ASGI with ASGI_ROOT_URLCONF,
+    which routes the read-only pages to their async views. Under WSGI the
+    middleware chain is synchronous and ROOT_URLCONF with the sync views
+    is used, which spares every request a switch to an event loop. Must
+    come before the middleware that resolves the request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = asgi_urlconf()
+        set_urlconf(request.urlconf)
+        return await self.get_response(request)
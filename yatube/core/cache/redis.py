@@ -0,0 +1,232 @@
+import pickle
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisClient:
+    """Minimal client of the Redis serialization protocol (RESP2). Commands
+    are sent as arrays of bulk strings; several commands can be pipelined
+    to save round trips.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, timeout=5):
+        self.address = (host, port)
+        self.db = db
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379,
+                   int(db) if db else 0)
+
+    def connect(self):
+        self._sock = socket.create_connection(self.address, self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile('rb')
+        if self.db:
+            self._send([('SELECT', self.db)])
+            self._read()
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock = self._file = None
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Send all commands at once and return the list of their replies.
+        A connection broken before the commands were sent is reopened once.
+        """
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self.connect()
+                self._send(commands)
+                break
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+        try:
+            replies = [self._read() for _ in commands]
+        except (OSError, EOFError):
+            self.close()
+            raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def _send(self, commands):
+        chunks = []
+        for args in commands:
+            chunks.append(b'*%d\r\n' % len(args))
+            for arg in args:
+                if not isinstance(arg, bytes):
+                    arg = str(arg).encode()
+                chunks.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._sock.sendall(b''.join(chunks))
+
+    def _read(self):
+        line = self._file.readline()
+        if not line.endswith(b'\r\n'):
+            raise EOFError('Connection closed by server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return RedisError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length == -1:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length == -1:
+                return None
+            return [self._read() for _ in range(length)]
+        raise RedisError(f'Unknown reply: {line!r}')
+
+
+def dump(value):
+    # Integers are stored as is, so that INCRBY works on them.
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def load(value):
+    try:
+        return int(value)
+    except ValueError:
+        return pickle.loads(value)
+
+
+class RedisCache(BaseCache):
+    """Cache backend on top of RedisClient, one connection per thread.
+    LOCATION is a redis://host:port/db URL.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = RedisClient.from_url(self.location)
+            self._local.client = client
+        return client
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+    def _expired(self, timeout):
+        timeout = self._timeout(timeout)
+        return timeout is not None and timeout <= 0
+
+    def _expiry_args(self, timeout):
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._expired(timeout):
+            return False
+        reply = self.client.execute(
+            'SET', key, dump(value), 'NX', *self._expiry_args(timeout))
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        value = self.client.execute('GET', self._key(key, version))
+        return default if value is None else load(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        keys = [self._key(key, version) for key in data]
+        if not keys:
+            return []
+        if self._expired(timeout):
+            self.client.execute('DEL', *keys)
+            return []
+        expiry = self._expiry_args(timeout)
+        self.client.pipeline([
+            ('SET', key, dump(value), *expiry)
+            for key, value in zip(keys, data.values())
+        ])
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry_args(timeout)
+        if expiry:
+            return self.client.execute('PEXPIRE', key, expiry[1]) == 1
+        self.client.execute('PERSIST', key)
+        return self.client.execute('EXISTS', key) == 1
+
+    def delete(self, key, version=None):
+        self.client.execute('DEL', self._key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.client.execute('DEL', *keys)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        values = self.client.execute('MGET', *keys)
+        return {original: load(value)
+                for original, value in zip(keys.values(), values)
+                if value is not None}
+
+    def has_key(self, key, version=None):
+        return self.client.execute('EXISTS', self._key(key, version)) == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self.client.execute('EXISTS', key):
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            return self.client.execute('INCRBY', key, delta)
+        except RedisError as error:
+            raise ValueError(str(error))
+
+    def clear(self):
+        self.client.execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Connections are kept open between requests on purpose.
+        pass
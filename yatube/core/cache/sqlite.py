@@ -0,0 +1,156 @@
+import pickle
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from ..sqlitefile import LocalSQLiteFile
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+)
+NOT_EXPIRED = '(expires IS NULL OR expires > ?)'
+CULL_EVERY = 100
+
+
+def dump(value):
+    # Integers are stored as is, so that incr() can be done by SQLite.
+    if type(value) is int:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def load(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class CacheFile(LocalSQLiteFile):
+    """Table of cache entries in a file of the host."""
+    schema = SCHEMA
+
+
+class SQLiteCache(BaseCache):
+    """Cache kept in a SQLite file shared by all worker processes of a host.
+    The database runs in WAL mode, so readers never wait for a writer.
+    LOCATION is the path of the database file.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = location
+        self.file = CacheFile.load(location)
+        self._writes = 0
+
+    def _expires(self, timeout):
+        # get_backend_timeout() returns an absolute time or None.
+        return self.get_backend_timeout(timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self.file.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND NOT ' + NOT_EXPIRED,
+                (key, now))
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                (key, dump(value), self._expires(timeout)))
+        self._maybe_cull()
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self.file.connection.execute(
+            'SELECT value FROM cache WHERE key = ? AND ' + NOT_EXPIRED,
+            (key, time.time())).fetchone()
+        return default if row is None else load(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [(self._key(key, version), dump(value), expires)
+                for key, value in data.items()]
+        with self.file.transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', rows)
+        self._maybe_cull()
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self.file.transaction() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? AND '
+                + NOT_EXPIRED,
+                (self._expires(timeout), key, time.time()))
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self.file.transaction() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self.file.connection.execute(
+            f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+            'AND ' + NOT_EXPIRED,
+            [*keys, time.time()])
+        return {keys[key]: load(value) for key, value in rows}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self.file.connection.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND ' + NOT_EXPIRED,
+            (key, time.time())).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self.file.transaction() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET value = value + ? WHERE key = ? '
+                "AND typeof(value) = 'integer' AND " + NOT_EXPIRED,
+                (delta, key, time.time()))
+            if cursor.rowcount != 1:
+                raise ValueError(f"Key '{key}' not found")
+            return connection.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)).fetchone()[0]
+
+    def clear(self):
+        with self.file.transaction() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are kept open between requests on purpose.
+        pass
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % CULL_EVERY:
+            return
+        with self.file.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE NOT ' + NOT_EXPIRED, (time.time(),))
+            count = connection.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self._max_entries:
+                connection.execute(
+                    'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM '
+                    'cache ORDER BY rowid LIMIT ?)',
+                    (count // self._cull_frequency,))
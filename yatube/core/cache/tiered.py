@@ -0,0 +1,284 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SEQUENCE_KEY = 'tiered:sequence'
+LOG_KEY = 'tiered:log:{}'
+LOCK_KEY = 'tiered:lock:{}'
+MAX_LOG_GAP = 1000
+MISSING = object()
+
+
+class LocalLRU:
+    """Bounded in-process store. Values are pickled like in LocMemCache,
+    so callers never share mutable objects.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache(BaseCache):
+    """Two-tier cache: a small LRU in every worker process (L1) in front of
+    a cache shared by all workers (L2), named by the SHARED option.
+
+    Writes go to both tiers and are appended to an invalidation log kept in
+    L2. Every worker reads the log at most once per POLL_INTERVAL seconds
+    and drops the changed keys from its L1, so L1 lags behind other
+    workers for no longer than that. L1 entries also expire after
+    LOCAL_TIMEOUT seconds.
+
+    get_or_set() is single-flight: only one thread of one worker computes
+    a missing value while the others wait for it to appear in L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 30)
+        self.poll_interval = options.get('POLL_INTERVAL', 0.5)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.log_timeout = options.get('LOG_TIMEOUT', 60)
+        self.local = LocalLRU(self._max_entries)
+        self._flight_locks = [threading.Lock() for _ in range(64)]
+        self._sync_lock = threading.Lock()
+        self._sequence = None
+        self._own_sequences = set()
+        self._synced_at = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def sync(self, force=False):
+        """Apply invalidations published by other workers to L1."""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.poll_interval:
+            return
+        with self._sync_lock:
+            self._synced_at = now
+            sequence = self.shared.get(SEQUENCE_KEY)
+            if sequence is None or self._sequence is None or (
+                    sequence < self._sequence):
+                # First sync or L2 was cleared: nothing is known about
+                # the entries in L1.
+                if self._sequence is not None:
+                    self.local.clear()
+                self._sequence = sequence or 0
+                return
+            if sequence == self._sequence:
+                return
+            if sequence - self._sequence > MAX_LOG_GAP:
+                # Too far behind or L2 was cleared and the sequence started
+                # again from a new base.
+                self.local.clear()
+                self._own_sequences.clear()
+                self._sequence = sequence
+                return
+            numbers = [number
+                       for number in range(self._sequence + 1, sequence + 1)
+                       if number not in self._own_sequences]
+            logs = self.shared.get_many(
+                [LOG_KEY.format(number) for number in numbers])
+            if len(logs) < len(numbers):
+                self.local.clear()
+            else:
+                self.local.delete_many(
+                    key for keys in logs.values() for key in keys)
+            self._own_sequences.difference_update(
+                range(self._sequence + 1, sequence + 1))
+            self._sequence = sequence
+
+    def publish(self, keys):
+        """Tell other workers to drop keys from their L1."""
+        try:
+            sequence = self.shared.incr(SEQUENCE_KEY)
+        except ValueError:
+            # A new sequence starts from the current time in milliseconds,
+            # so that a restart after clear() is seen as a jump forward.
+            self.shared.add(SEQUENCE_KEY, int(time.time() * 1000), None)
+            sequence = self.shared.incr(SEQUENCE_KEY)
+        self._own_sequences.add(sequence)
+        self.shared.set(LOG_KEY.format(sequence), list(keys),
+                        self.log_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self.shared.add(key, value, timeout, version):
+            return False
+        full_key = self._key(key, version)
+        self.local.set(full_key, value, self._local_timeout(timeout))
+        self.publish([full_key])
+        return True
+
+    def get(self, key, default=None, version=None):
+        self.sync()
+        full_key = self._key(key, version)
+        value = self.local.get(full_key)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self.local.set(full_key, value, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        self.sync()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(self._key(key, version))
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            for key, value in shared.items():
+                self.local.set(
+                    self._key(key, version), value, self.local_timeout)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        local_timeout = self._local_timeout(timeout)
+        full_keys = []
+        for key, value in data.items():
+            full_key = self._key(key, version)
+            full_keys.append(full_key)
+            if local_timeout > 0 and key not in failed:
+                self.local.set(full_key, value, local_timeout)
+            else:
+                self.local.delete_many([full_key])
+        if full_keys:
+            self.publish(full_keys)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.shared.touch(key, timeout, version)
+        # Local copies would outlive a shorter timeout.
+        full_key = self._key(key, version)
+        self.local.delete_many([full_key])
+        self.publish([full_key])
+        return touched
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version)
+        full_keys = [self._key(key, version) for key in keys]
+        self.local.delete_many(full_keys)
+        if full_keys:
+            self.publish(full_keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        full_key = self._key(key, version)
+        self.local.delete_many([full_key])
+        self.publish([full_key])
+        return value
+
+    def clear(self):
+        # Clearing L2 also removes the log, other workers notice it by
+        # the sequence going back and clear their L1.
+        self.shared.clear()
+        self.local.clear()
+        with self._sync_lock:
+            self._sequence = None
+            self._own_sequences.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, MISSING, version)
+        if value is not MISSING:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version)
+            return self.get(key, default, version)
+        full_key = self._key(key, version)
+        flight_lock = self._flight_locks[hash(full_key) % 64]
+        with flight_lock:
+            value = self.get(key, MISSING, version)
+            if value is not MISSING:
+                return value
+            lock_key = LOCK_KEY.format(full_key)
+            if self.shared.add(lock_key, 1, self.lock_timeout):
+                try:
+                    value = default()
+                    self.set(key, value, timeout, version)
+                finally:
+                    self.shared.delete(lock_key)
+                return value
+            value = self._wait_for(key, version)
+            if value is MISSING:
+                value = default()
+                self.set(key, value, timeout, version)
+            return value
+
+    def _wait_for(self, key, version):
+        """Wait for another worker to store the value it computes."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.shared.get(key, MISSING, version)
+            if value is not MISSING:
+                self.local.set(
+                    self._key(key, version), value, self.local_timeout)
+                return value
+        return MISSING
@@ -0,0 +1,246 @@
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+PIN_COOKIE = 'primary'
+# Upper bound of the life of PIN_COOKIE. It is deleted as soon as all the
+# replicas are synced after the write it was set for.
+PIN_MAX_AGE = 60 * 60 * 24
+# Sessions and users are always read from the primary database, so that
+# logging in or out takes effect at once on every page.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+request_reads = ContextVar('request_reads', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def synced_key(alias):
+    return f'replica:{alias}:synced'
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def synced_replicas(aliases, written):
+    """Replicas copied from the primary database after the given time of
+    a write, in milliseconds. A replica never synced is never fresh.
+    """
+    synced = cache.get_many([synced_key(alias) for alias in aliases])
+    return [alias for alias in aliases
+            if synced.get(synced_key(alias), 0) >= written]
+
+
+class Reads:
+    """Database the queries of a request are read from and whether the
+    request wrote anything.
+    """
+
+    def __init__(self, alias=None):
+        self.alias = alias
+        self.wrote = False
+
+
+def replica_reads(view):
+    """Mark a view that only reads as one to be served from a replica."""
+    view.replica_reads = True
+    return view
+
+
+def current_replica():
+    """Alias of the replica the current request reads from, if any."""
+    reads = request_reads.get()
+    return reads.alias if reads is not None else None
+
+
+def pin_to_primary():
+    """Make the user read from the primary database for a while after a
+    write that did not go through the router.
+    """
+    reads = request_reads.get()
+    if reads is not None:
+        reads.wrote = True
+
+
+def replica_stamp():
+    """Identify the copy of the data the current request reads: an empty
+    string for the primary database, the replica and the time of its last
+    sync otherwise. Pages and fragments cached by the version of their
+    data add the stamp to the key, since a replica may still show the
+    data of an older version.
+    """
+    alias = current_replica()
+    if alias is None:
+        return ''
+    key = synced_key(alias)
+    synced = cache.get(key)
+    if synced is None:
+        # Not a time: a replica with an unknown sync stays behind writes.
+        cache.add(key, 0, None)
+        synced = cache.get(key)
+    return f'{alias}@{synced}'
+
+
+class ReplicaRouter:
+    """Send reads of the views marked with replica_reads() to the replica
+    chosen by ReplicaMiddleware, everything else to the primary database.
+    Objects read from a replica are saved to the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return None
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        reads = request_reads.get()
+        if reads is not None:
+            reads.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Choose a random replica for GET requests of views marked with
+    replica_reads(). Must come before the anonymous page cache, which
+    checks the page versions of the chosen copy.
+
+    A request that wrote to the database sets a cookie with the time of
+    the write. The requests that carry it read only from replicas synced
+    after that time, or from the primary database: the user sees their
+    own post, comment or follow before the replicas are synced. The
+    cookie is deleted once every replica has the write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        aliases = replica_aliases()
+        if not aliases:
+            return self.get_response(request)
+        written = self.written(request)
+        fresh = aliases
+        if written is not None:
+            fresh = synced_replicas(aliases, written)
+        reads = self.choose(request, fresh)
+        token = request_reads.set(reads)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_reads.reset(token)
+        return self.finish(response, reads, written, fresh, aliases)
+
+    async def __acall__(self, request):
+        aliases = replica_aliases()
+        if not aliases:
+            return await self.get_response(request)
+        written = self.written(request)
+        fresh = aliases
+        if written is not None:
+            fresh = await sync_to_async(synced_replicas)(aliases, written)
+        reads = self.choose(request, fresh)
+        token = request_reads.set(reads)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_reads.reset(token)
+        return self.finish(response, reads, written, fresh, aliases)
+
+    def choose(self, request, fresh):
+        reads = Reads()
+        if (fresh and request.method in ('GET', 'HEAD')
+                and self.reads_replica(request)):
+            reads.alias = random.choice(fresh)
+        return reads
+
+    def finish(self, response, reads, written, fresh, aliases):
+        if reads.wrote:
+            response.set_cookie(
+                PIN_COOKIE, str(now_ms()), max_age=PIN_MAX_AGE,
+                httponly=True, samesite='Lax')
+        elif written is not None and len(fresh) == len(aliases):
+            response.delete_cookie(PIN_COOKIE, samesite='Lax')
+        return response
+
+    def written(self, request):
+        """Time of the last write of the user, if it may be missing on
+        some replica. A malformed cookie counts as a write just now.
+        """
+        value = request.COOKIES.get(PIN_COOKIE)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return now_ms()
+
+    def reads_replica(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return getattr(match.func, 'replica_reads', False)
+
+
+def copy_database(target):
+    """Copy the primary SQLite database to the target file with the
+    online backup API. Readers of the target see the old copy until the
+    new one is complete. The backup waits for the transactions of its own
+    connection to end, so it cannot run inside one.
+    """
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError('Only SQLite databases can be copied.')
+    if primary.in_atomic_block:
+        raise ValueError('The database cannot be copied in a transaction.')
+    primary.ensure_connection()
+    copy = sqlite3.connect(target)
+    try:
+        primary.connection.backup(copy)
+    finally:
+        copy.close()
+
+
+def sync_replicas(aliases=None, progress=None):
+    """Copy the primary database to the replicas and move their sync
+    stamps forward. The stamp is the time the copy started: every write
+    committed before it is in the copy. Returns the synced aliases.
+    """
+    progress = progress or (lambda message: None)
+    aliases = replica_aliases() if aliases is None else aliases
+    for alias in aliases:
+        start = time.perf_counter()
+        started = now_ms()
+        copy_database(connections[alias].settings_dict['NAME'])
+        cache.set(synced_key(alias), started, None)
+        progress(f'{alias}: {time.perf_counter() - start:.2f} s')
+    return list(aliases)
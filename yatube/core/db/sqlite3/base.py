@@ -0,0 +1,92 @@
+import random
+import sqlite3
+import time
+
+from django.db.backends.sqlite3 import base
+
+# Set on every new connection, OPTIONS['pragmas'] overrides them.
+PRAGMAS = {
+    # Readers never wait for the writer and the writer never waits for
+    # readers.
+    'journal_mode': 'WAL',
+    # With WAL the database cannot be corrupted, only transactions
+    # committed just before a power loss may be rolled back.
+    'synchronous': 'NORMAL',
+    # Pages are read through a memory map shared by all connections
+    # instead of being copied to the page cache of each one.
+    'mmap_size': 256 * 2 ** 20,
+    # Page cache of each connection, in KiB when negative.
+    'cache_size': -32 * 2 ** 10,
+    # Milliseconds SQLite waits for the write lock before giving up.
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+BUSY_RETRIES = 3
+BUSY_BACKOFF = 0.05
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """Cursor repeating statements that failed because another connection
+    held the write lock for longer than busy_timeout. Only statements
+    that can be repeated safely are: those run in autocommit mode and
+    BEGIN, which has not done anything yet. Inside a transaction the
+    whole transaction would have to be repeated.
+    """
+    database = None
+
+    def execute(self, query, params=None):
+        return self.retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        # A generator could not be read again by a repeated statement.
+        return self.retry(super().executemany, query, list(param_list))
+
+    def retry(self, execute, query, params):
+        attempt = 0
+        while True:
+            try:
+                return execute(query, params)
+            except sqlite3.OperationalError as error:
+                if (attempt >= self.database.busy_retries
+                        or not is_busy(error)
+                        or not self.can_retry(query)):
+                    raise
+            attempt += 1
+            # Exponential backoff with jitter, so that the waiting writers
+            # do not wake up at the same time.
+            time.sleep(BUSY_BACKOFF * 2 ** attempt * random.random())
+
+    def can_retry(self, query):
+        return (self.database.get_autocommit()
+                or query.lstrip()[:5].upper() == 'BEGIN')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend tuned for a multi-threaded web server: WAL journal,
+    memory-mapped reads, a larger page cache and a busy timeout set by
+    PRAGMAS on connect, and writes retried with backoff when the database
+    stays locked. OPTIONS may hold 'pragmas' and 'busy_retries' besides
+    the options of django.db.backends.sqlite3.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.busy_retries = params.pop('busy_retries', BUSY_RETRIES)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.database = self
+        return cursor
@@ -0,0 +1,104 @@
+import re
+from functools import lru_cache
+from itertools import chain
+
+from django.template.defaultfilters import linebreaksbr
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+# Markers put around matches by a search index, e.g. by FTS5 highlight().
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+PATTERN_CACHE_SIZE = 256
+SNIPPET_SENTENCES = 3
+SNIPPET_LOOKBEHIND = 200
+SNIPPET_MAX_LENGTH = 600
+
+WORD_RE = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_query(query):
+    """Return a case-insensitive pattern matching any word of the query,
+    or None for a query without words. Words are escaped, so a query can
+    never turn into an expensive regular expression.
+    """
+    words = sorted(set(WORD_RE.findall((query or '').lower())),
+                   key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile('|'.join(map(re.escape, words)), re.IGNORECASE)
+
+
+def find_offsets(text, query):
+    """Yield (start, end) of the query words in text, lazily."""
+    pattern = compile_query(query)
+    if pattern is not None:
+        for match in pattern.finditer(text):
+            yield match.span()
+
+
+def marker_offsets(marked):
+    """Yield (start, end) of the matches wrapped in MARK_START/MARK_END,
+    as offsets into the text without the markers.
+    """
+    removed = 0
+    position = marked.find(MARK_START)
+    while position != -1:
+        end = marked.find(MARK_END, position)
+        if end == -1:
+            return
+        yield position - removed, end - removed - 1
+        removed += 2
+        position = marked.find(MARK_START, end)
+
+
+def snippet_window(text, start):
+    """Return the bounds of the snippet around a match starting at start:
+    from the beginning of its sentence to the end of the sentence
+    SNIPPET_SENTENCES - 1 further on. Only the text near the match is
+    looked at.
+    """
+    lower = max(start - SNIPPET_LOOKBEHIND, 0)
+    begin = text.rfind('.', lower, start) + 1
+    if not begin and lower:
+        begin = text.find(' ', lower, start) + 1 or lower
+    upper = min(begin + SNIPPET_MAX_LENGTH, len(text))
+    end = begin
+    for _ in range(SNIPPET_SENTENCES):
+        end = text.find('.', end + 1, upper)
+        if end == -1:
+            return begin, upper
+    return begin, end
+
+
+def highlight_html(text, query='', offsets=None):
+    """Return HTML of a snippet of text with matches in highlight spans and
+    line breaks as <br>. Offsets of the matches can be supplied by a
+    search index, otherwise the query words are searched for. Text without
+    matches is returned whole.
+    """
+    text = '' if text is None else str(text)
+    if offsets is None:
+        offsets = find_offsets(text, query)
+    offsets = iter(offsets)
+    first = next(offsets, None)
+    if first is None:
+        return linebreaksbr(text)
+    begin, end = snippet_window(text, first[0])
+    parts = []
+    position = begin
+    for start, stop in chain([first], offsets):
+        if start >= end:
+            break
+        if start < position:
+            continue
+        parts.append(linebreaksbr(text[position:start]))
+        parts.append(format_html("<span class='highlight'>{}</span>",
+                                 text[start:stop]))
+        position = stop
+    parts.append(linebreaksbr(text[position:max(end, position)]))
+    if end < len(text):
+        parts.append('...')
+    return mark_safe(''.join(parts))
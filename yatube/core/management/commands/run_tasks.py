@@ -0,0 +1,92 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import execute, finish, get_broker
+
+logger = logging.getLogger('core.tasks')
+
+
+def setup_worker():
+    """Runs first in every spawned worker process."""
+    django.setup()
+    autodiscover_modules('tasks')
+
+
+def run_task(name, args):
+    """Run a task, return the error as text. Exceptions are not sent back
+    to the parent, since they may not be picklable.
+    """
+    try:
+        execute(name, args)
+    except Exception as error:
+        logger.exception('Task %s%r raised', name, tuple(args))
+        return f'{type(error).__name__}: {error}'
+    finally:
+        close_old_connections()
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Run the queued background tasks in a pool of processes, '
+            'retrying failed ones with backoff.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of worker processes, CPU count by default. '
+                 'With 0 tasks run in the current process.')
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Number of tasks claimed from the queue at once.')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running, checking the queue every INTERVAL seconds, '
+                 'instead of stopping when no task is due.')
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        broker = get_broker()
+        if options['processes'] == 0:
+            executor = None
+        else:
+            # Spawned workers do not inherit connections of the parent,
+            # SQLite ones included.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                options['processes'], mp_context=get_context('spawn'),
+                initializer=setup_worker)
+        done = failed = 0
+        try:
+            while True:
+                claimed = broker.claim(options['batch_size'])
+                if not claimed:
+                    if not options['interval']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                if executor is None:
+                    errors = [run_task(name, args)
+                              for _, name, args, _ in claimed]
+                else:
+                    errors = executor.map(
+                        run_task, *zip(*((name, args)
+                                         for _, name, args, _ in claimed)))
+                for (pk, name, _, attempts), error in zip(claimed, errors):
+                    finish(broker, pk, name, attempts, error)
+                    done += error is None
+                    failed += error is not None
+                self.stdout.write(f'Tasks done: {done}, failed: {failed}')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        counts = broker.counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Tasks done: {done}, failed: {failed}, waiting: "
+            f"{counts['waiting']}, failed for good: {counts['failed']}"))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db.replicas import replica_aliases, sync_replicas
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary database to the read replicas listed in the '
+            'DATABASE_REPLICAS setting.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Replicas to sync, all of them by default.')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep syncing every INTERVAL seconds instead of once.')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replica_aliases()
+        unknown = set(aliases) - set(replica_aliases())
+        if unknown:
+            raise CommandError(
+                f"Not replicas: {', '.join(sorted(unknown))}.")
+        if not aliases:
+            raise CommandError('No replicas in DATABASE_REPLICAS.')
+        while True:
+            try:
+                sync_replicas(aliases, progress=self.stdout.write)
+            except ValueError as error:
+                raise CommandError(error)
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced replicas: {', '.join(aliases)}"))
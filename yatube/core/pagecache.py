@@ -0,0 +1,127 @@
+import hashlib
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def page_cache_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 10)
+
+
+def page_cache_max_age():
+    return getattr(settings, 'PAGE_CACHE_MAX_AGE', 60)
+
+
+def page_key(request, etag):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{path}:{etag}'
+
+
+class AnonymousPageCacheMiddleware:
+    """Serve whole pages to anonymous visitors from the cache, before the
+    session, CSRF and authentication middleware run.
+
+    Only views with a page_stamp attribute (see
+    posts.conditional.conditional_page) are cached. The page ETag is part
+    of the key, so the signals that move page versions forward invalidate
+    the cached copies as well. A request with a session or messages cookie
+    may show user-specific content and bypasses the cache; such responses
+    are marked private. Anonymous responses are marked public for
+    PAGE_CACHE_MAX_AGE seconds, so that a reverse proxy can serve them too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        match = self.match_page(request)
+        if match is None:
+            return self.get_response(request)
+        if not self.is_anonymous(request):
+            return self.mark_private(self.get_response(request))
+        key, modified = self.lookup(request, match)
+        response = cache.get(key)
+        if response is None:
+            response = self.get_response(request)
+            if self.store(response):
+                cache.set(key, response, page_cache_timeout())
+            return response
+        return self.hit(request, response, modified)
+
+    async def __acall__(self, request):
+        match = self.match_page(request)
+        if match is None:
+            return await self.get_response(request)
+        if not self.is_anonymous(request):
+            return self.mark_private(await self.get_response(request))
+        # The page stamp reads the page versions and may query the database.
+        key, modified = await sync_to_async(self.lookup)(request, match)
+        response = await cache.aget(key)
+        if response is None:
+            response = await self.get_response(request)
+            if self.store(response):
+                await cache.aset(key, response, page_cache_timeout())
+            return response
+        return self.hit(request, response, modified)
+
+    def lookup(self, request, match):
+        """Cache key of the current version of the page and the time it
+        was last modified.
+        """
+        # Kept for the code that runs on a cache hit instead of the view.
+        request.resolver_match = match
+        etag, modified = match.func.page_stamp(
+            request, *match.args, **match.kwargs)
+        return page_key(request, etag), modified
+
+    def store(self, response):
+        """Mark a fresh response public, tell whether it can be cached."""
+        if response.status_code in (200, 304):
+            self.mark_public(response)
+        return self.is_cacheable(response)
+
+    def hit(self, request, response, modified):
+        self.mark_public(response)
+        return get_conditional_response(
+            request, etag=response['ETag'],
+            last_modified=int(modified.timestamp()), response=response)
+
+    def match_page(self, request):
+        """Return the ResolverMatch of a GET of a cacheable page."""
+        if request.method != 'GET':
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if not hasattr(match.func, 'page_stamp'):
+            return None
+        return match
+
+    def is_anonymous(self, request):
+        return not (settings.SESSION_COOKIE_NAME in request.COOKIES
+                    or 'messages' in request.COOKIES)
+
+    def is_cacheable(self, response):
+        return (response.status_code == 200
+                and not response.streaming
+                and not response.cookies)
+
+    def mark_private(self, response):
+        patch_cache_control(response, private=True)
+        return response
+
+    def mark_public(self, response):
+        patch_cache_control(response, public=True,
+                            max_age=page_cache_max_age())
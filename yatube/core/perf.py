@@ -0,0 +1,285 @@
+import functools
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+UNRESOLVED_VIEW = '<unresolved>'
+
+request_stats = ContextVar('request_stats', default=None)
+
+
+def sample_rate():
+    return getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+
+
+class RequestStats:
+    """What a sampled request spent its time on."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def duplicates(self):
+        """Number of queries repeating an earlier one with the same
+        parameters.
+        """
+        return sum(count - 1 for count in self.statements.values())
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.queries} queries, {self.duplicates} duplicates"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+def record_cache(hits, misses):
+    """Count fragment cache lookups of the current request, if sampled."""
+    stats = request_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def instrument_templates():
+    """Time the outermost Template.render() of sampled requests. Included
+    templates are rendered inside it and are not counted twice.
+    """
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    @functools.wraps(original)
+    def render(self, context):
+        stats = request_stats.get()
+        if stats is None or stats.template_depth:
+            return original(self, context)
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.template_time += time.perf_counter() - start
+            stats.template_depth -= 1
+
+    render.instrumented = True
+    Template.render = render
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def escape_label(value):
+    return (value.replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+class MetricsRegistry:
+    """Per-process metrics labelled by view, rendered in the Prometheus
+    text exposition format. Every worker process keeps its own registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def observe(self, name, help_text, buckets, view, value):
+        with self._lock:
+            self._help[name] = ('histogram', help_text)
+            histogram = self._histograms.setdefault(name, {}).get(view)
+            if histogram is None:
+                histogram = Histogram(buckets)
+                self._histograms[name][view] = histogram
+            histogram.observe(value)
+
+    def inc(self, name, help_text, view, value=1):
+        with self._lock:
+            self._help[name] = ('counter', help_text)
+            counters = self._counters.setdefault(name, {})
+            counters[view] = counters.get(view, 0) + value
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._help.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                if kind == 'counter':
+                    for view, value in sorted(self._counters[name].items()):
+                        lines.append(
+                            f'{name}{{view="{escape_label(view)}"}} {value}')
+                    continue
+                for view, histogram in sorted(self._histograms[name].items()):
+                    label = f'view="{escape_label(view)}"'
+                    total = 0
+                    for bound, count in zip(histogram.buckets,
+                                            histogram.counts):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {total}')
+                    lines.append(
+                        f'{name}_bucket{{{label},le="+Inf"}} '
+                        f'{histogram.count}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class PerformanceMiddleware:
+    """Measure every request and describe a sample of them in detail.
+
+    The total time of all requests goes to a per-view histogram. Only a
+    PERF_SAMPLE_RATE share of requests is instrumented further: SQL queries
+    and their duplicates, template rendering and fragment cache lookups.
+    Sampled responses get a Server-Timing header shown by browser
+    developer tools. Should be the first middleware to see the whole
+    request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_templates()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if random.random() >= sample_rate():
+            response = self.get_response(request)
+            self.observe_total(request, time.perf_counter() - start)
+            return response
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, stats)
+                response = self.get_response(request)
+        finally:
+            request_stats.reset(token)
+        return self.finish(request, response, start, stats)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if random.random() >= sample_rate():
+            response = await self.get_response(request)
+            self.observe_total(request, time.perf_counter() - start)
+            return response
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            # Under ASGI the queries of a request, async ORM calls included,
+            # run in one thread of the request, whose connections are
+            # wrapped here.
+            stack = ExitStack()
+            await sync_to_async(self.wrap_connections)(stack, stats)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            request_stats.reset(token)
+        return self.finish(request, response, start, stats)
+
+    def wrap_connections(self, stack, stats):
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(stats.execute_wrapper))
+
+    def finish(self, request, response, start, stats):
+        total = time.perf_counter() - start
+        view = self.observe_total(request, total)
+        self.observe_sample(view, stats)
+        response['Server-Timing'] = stats.server_timing(total)
+        return response
+
+    def observe_total(self, request, total):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED_VIEW
+        registry.observe(
+            'yatube_request_duration_seconds',
+            'Time spent processing a request.',
+            DURATION_BUCKETS, view, total)
+        return view
+
+    def observe_sample(self, view, stats):
+        registry.inc('yatube_sampled_requests_total',
+                     'Number of requests instrumented in detail.', view)
+        registry.observe('yatube_db_queries',
+                         'SQL queries per sampled request.',
+                         QUERY_BUCKETS, view, stats.queries)
+        registry.observe('yatube_db_duration_seconds',
+                         'Time spent in SQL queries per sampled request.',
+                         DURATION_BUCKETS, view, stats.sql_time)
+        registry.observe('yatube_template_duration_seconds',
+                         'Time spent rendering templates per sampled '
+                         'request.',
+                         DURATION_BUCKETS, view, stats.template_time)
+        registry.inc('yatube_db_duplicate_queries_total',
+                     'Queries repeating an earlier query of the request.',
+                     view, stats.duplicates)
+        registry.inc('yatube_fragment_cache_hits_total',
+                     'Fragments served from the cache.',
+                     view, stats.cache_hits)
+        registry.inc('yatube_fragment_cache_misses_total',
+                     'Fragments rendered because of a cache miss.',
+                     view, stats.cache_misses)
@@ -0,0 +1,53 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+class LocalSQLiteFile:
+    """Data kept in a SQLite file shared by the web and worker processes
+    of a host, with a connection per thread in autocommit mode. A commit
+    in WAL mode with synchronous=NORMAL is not flushed to disk, so the
+    data survives a crash of the process, not of the host. Subclasses
+    list the statements creating their tables in schema.
+    """
+    schema = ()
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls, path):
+        """The one instance of the class for the file in this process."""
+        return load_file(cls, path)
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.schema:
+                connection.execute(statement)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+
+@lru_cache(maxsize=None)
+def load_file(cls, path):
+    return cls(path)
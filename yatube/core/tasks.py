@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .sqlitefile import LocalSQLiteFile
+
+TASK_RETRIES = 3
+TASK_BACKOFF = 5.0
+# Seconds a claimed task belongs to a worker. Tasks of a worker that died
+# are run again when their lease is over.
+TASK_LEASE = 300
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS tasks ('
+    'id INTEGER PRIMARY KEY, name TEXT NOT NULL, args TEXT NOT NULL, '
+    'ident TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+    'run_at REAL NOT NULL, locked_until REAL, '
+    'failed INTEGER NOT NULL DEFAULT 0, error TEXT)',
+    # At most one waiting task of every name and arguments.
+    'CREATE UNIQUE INDEX IF NOT EXISTS tasks_waiting ON tasks (ident) '
+    'WHERE locked_until IS NULL AND failed = 0',
+    'CREATE INDEX IF NOT EXISTS tasks_due ON tasks (failed, run_at)',
+)
+
+logger = logging.getLogger(__name__)
+registry = {}
+
+
+def background_enabled():
+    return getattr(settings, 'TASKS_BACKGROUND', False)
+
+
+def broker_path():
+    return getattr(settings, 'TASKS_BROKER',
+                   os.path.join(settings.BASE_DIR, 'tasks.sqlite3'))
+
+
+class Task:
+    """Function run by the run_tasks worker. Arguments must be JSON
+    serializable. A task waiting in the queue is not added again with
+    the same arguments, and tasks with the same arguments never run at
+    the same time.
+    """
+
+    def __init__(self, func, name, retries, backoff):
+        self.func = func
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def enqueue(self, *args):
+        """Queue the task once the current transaction is committed, so
+        the worker sees the data it was queued for. Without
+        TASKS_BACKGROUND the task runs at once instead.
+        """
+        if not background_enabled():
+            self.func(*args)
+            return
+        transaction.on_commit(lambda: get_broker().push(self.name, args))
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter after the given attempts."""
+        return self.backoff * 2 ** (attempts - 1) * random.uniform(0.5, 1)
+
+
+def task(func=None, *, retries=TASK_RETRIES, backoff=TASK_BACKOFF):
+    """Register a function as a task, usable as @task or @task(...)."""
+    def register(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = Task(func, name, retries, backoff)
+        return registry[name]
+    return register(func) if func is not None else register
+
+
+class Broker(LocalSQLiteFile):
+    """Queue of tasks in a file of the host."""
+    schema = SCHEMA
+
+    def push(self, name, args):
+        """Queue a task unless the same one is already waiting."""
+        args = json.dumps(list(args))
+        self.connection.execute(
+            'INSERT OR IGNORE INTO tasks (name, args, ident, run_at) '
+            'VALUES (?, ?, ?, ?)', (name, args, f'{name}:{args}', time.time()))
+
+    def claim(self, limit, lease=TASK_LEASE):
+        """Lease up to limit due tasks, returned as (id, name, args,
+        attempts) rows. An equal task may be queued while one runs, but
+        it is not claimed before the running one finishes.
+        """
+        now = time.time()
+        with self.transaction() as connection:
+            rows = connection.execute(
+                'SELECT id, name, args, ident, attempts FROM tasks '
+                'WHERE failed = 0 AND run_at <= ? '
+                'AND (locked_until IS NULL OR locked_until < ?) '
+                'AND ident NOT IN (SELECT ident FROM tasks '
+                'WHERE locked_until >= ?) '
+                'ORDER BY run_at, id', (now, now, now)).fetchall()
+            claimed = []
+            idents = set()
+            for pk, name, args, ident, attempts in rows:
+                # A task whose worker died and its waiting copy.
+                if ident in idents:
+                    continue
+                idents.add(ident)
+                connection.execute(
+                    'UPDATE tasks SET locked_until = ?, '
+                    'attempts = attempts + 1 WHERE id = ?', (now + lease, pk))
+                claimed.append((pk, name, json.loads(args), attempts + 1))
+                if len(claimed) == limit:
+                    break
+        return claimed
+
+    def done(self, pk):
+        self.connection.execute('DELETE FROM tasks WHERE id = ?', (pk,))
+
+    def fail(self, pk, error, delay=None):
+        """Schedule the task to run again in delay seconds, or keep it as
+        failed for inspection when delay is None. A retry is dropped when
+        an equal task was queued in the meantime, which will run anyway.
+        """
+        if delay is None:
+            self.connection.execute(
+                'UPDATE tasks SET failed = 1, locked_until = NULL, '
+                'error = ? WHERE id = ?', (error, pk))
+            return
+        try:
+            self.connection.execute(
+                'UPDATE tasks SET run_at = ?, locked_until = NULL, '
+                'error = ? WHERE id = ?', (time.time() + delay, error, pk))
+        except sqlite3.IntegrityError:
+            self.done(pk)
+
+    def counts(self):
+        """Numbers of waiting and failed tasks."""
+        waiting, failed = self.connection.execute(
+            'SELECT COUNT(*) - COALESCE(SUM(failed), 0), '
+            'COALESCE(SUM(failed), 0) FROM tasks').fetchone()
+        return {'waiting': waiting, 'failed': failed}
+
+
+def get_broker():
+    return Broker.load(broker_path())
+
+
+def execute(name, args):
+    """Run a registered task, in a worker process too."""
+    return registry[name].func(*args)
+
+
+def finish(broker, pk, name, attempts, error=None):
+    """Record the outcome of a claimed task."""
+    if error is None:
+        broker.done(pk)
+        return
+    task = registry.get(name)
+    retries = task.retries if task is not None else 0
+    if attempts > retries:
+        logger.error('Task %s failed for good: %s', name, error)
+        broker.fail(pk, error)
+    else:
+        logger.warning('Task %s failed, attempt %s: %s',
+                       name, attempts, error)
+        broker.fail(pk, error, task.retry_delay(attempts))
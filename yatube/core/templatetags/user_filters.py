@@ -1,7 +1,6 @@
-import re
-
 from django import template
-from django.utils.safestring import mark_safe
+
+from ..highlight import highlight_html, marker_offsets
 
 register = template.Library()
 
@@ -13,20 +12,13 @@ def addclass(field, css):
 
 @register.filter()
 def highlight(text, value):
-    if text is not None:
-        text = str(text)
-        src_str = re.compile(f'({value})', re.IGNORECASE)
-        str_replaced = src_str.sub(r"<span class='highlight'>\1</span>", text)
-    else:
-        str_replaced = ''
-
-    sentences = str_replaced.split('.')
-    for num, sentence in enumerate(sentences):
-        if value.lower() in sentence.lower():
-            if len(sentences) - num > 1:
-                str_replaced = '.'.join(sentences[num:num + 3]) + '...'
-            else:
-                str_replaced = str(sentence) + '...'
-            break
-
-    return mark_safe(str_replaced)
+    return highlight_html(text, value)
+
+
+@register.simple_tag
+def search_snippet(text, query, marked=None):
+    """Highlighted snippet of a found post. Matches marked by the search
+    index are used when the backend supplies them.
+    """
+    offsets = marker_offsets(marked) if marked else None
+    return highlight_html(text, query, offsets)
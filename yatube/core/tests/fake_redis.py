@@ -0,0 +1,133 @@
+import socketserver
+import threading
+import time
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Understands the subset of Redis commands used by RedisCache."""
+
+    def handle(self):
+        while True:
+            try:
+                command = self.read_command()
+            except EOFError:
+                return
+            reply = self.server.execute(command)
+            self.wfile.write(self.encode(reply))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            raise EOFError
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def encode(self, reply):
+        if isinstance(reply, Exception):
+            return b'-ERR %s\r\n' % str(reply).encode()
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(
+                self.encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.expires = {}
+        self.commands = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'redis://{}:{}/0'.format(*self.server_address)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def execute(self, args):
+        name = args[0].decode().upper()
+        self.commands.append(name)
+        with self.lock:
+            return getattr(self, 'do_' + name.lower())(*args[1:])
+
+    def do_ping(self):
+        return 'PONG'
+
+    def do_select(self, db):
+        return 'OK'
+
+    def do_get(self, key):
+        return self.data[key] if self.alive(key) else None
+
+    def do_mget(self, *keys):
+        return [self.do_get(key) for key in keys]
+
+    def do_set(self, key, value, *options):
+        options = [option.decode().upper() for option in options]
+        if 'NX' in options and self.alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if 'PX' in options:
+            milliseconds = int(options[options.index('PX') + 1])
+            self.expires[key] = time.time() + milliseconds / 1000
+        return 'OK'
+
+    def do_del(self, *keys):
+        deleted = 0
+        for key in keys:
+            if self.alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                deleted += 1
+        return deleted
+
+    def do_exists(self, key):
+        return int(self.alive(key))
+
+    def do_incrby(self, key, delta):
+        try:
+            value = int(self.data.get(key, b'0')) + int(delta)
+        except ValueError:
+            return ValueError('value is not an integer')
+        self.data[key] = str(value).encode()
+        return value
+
+    def do_pexpire(self, key, milliseconds):
+        if not self.alive(key):
+            return 0
+        self.expires[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    def do_persist(self, key):
+        return int(self.expires.pop(key, None) is not None)
+
+    def do_flushdb(self):
+        self.data.clear()
+        self.expires.clear()
+        return 'OK'
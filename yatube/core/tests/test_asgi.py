@@ -0,0 +1,38 @@
+import asyncio
+
+from django.core.handlers.asgi import ASGIHandler
+from django.test import SimpleTestCase
+
+from yatube.asgi import application
+
+
+def call(application, scope):
+    messages = []
+    requests = [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the response is sent.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return messages
+
+
+class ASGIApplicationTests(SimpleTestCase):
+    def test_django_application(self):
+        """Приложение ASGI — обработчик Django, который отвечает
+        на запросы.
+        """
+        self.assertIsInstance(application, ASGIHandler)
+        messages = call(application, {
+            'type': 'http', 'method': 'GET', 'path': '/about/tech/',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)})
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(m.get('body', b'') for m in messages[1:])
+        self.assertIn('Технологии'.encode(), body)
@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ..cache.redis import RedisCache
+from ..cache.sqlite import SQLiteCache
+from ..cache.tiered import TieredCache
+from .fake_redis import FakeRedisServer
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+SHARED_LOCATION = os.path.join(TEMP_CACHE_DIR, 'shared.sqlite3')
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+
+class BackendContractMixin:
+    """Общие проверки поведения бэкенда кэша."""
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 'два'})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        self.cache.set('short', 'value', 0.1)
+        self.cache.set('forever', 'value', None)
+        self.cache.set('gone', 'value', 0)
+        self.assertIsNone(self.cache.get('gone'))
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertTrue(self.cache.add('short', 'new'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+
+    def test_touch(self):
+        self.cache.set('key', 'value', 0.1)
+        self.assertTrue(self.cache.touch('key', None))
+        self.assertFalse(self.cache.touch('missing', None))
+        time.sleep(0.2)
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertTrue(self.cache.touch('key', 0.1))
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('key'))
+
+
+class RedisCacheTests(BackendContractMixin, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache = RedisCache(self.server.url, {})
+        self.cache.clear()
+
+    def test_get_many_single_round_trip(self):
+        """get_many выполняется одной командой MGET."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.server.commands.clear()
+        self.cache.get_many(['a', 'b'])
+        self.assertEqual(self.server.commands, ['MGET'])
+
+
+class SQLiteCacheTests(BackendContractMixin, SimpleTestCase):
+    def setUp(self):
+        self.cache = SQLiteCache(SHARED_LOCATION, {})
+        self.cache.clear()
+
+    def test_shared_connection(self):
+        """Экземпляры кэша одного файла используют одно соединение потока."""
+        other = SQLiteCache(SHARED_LOCATION, {})
+        self.assertIs(other.file, self.cache.file)
+        self.assertIs(other.file.connection, self.cache.file.connection)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': SHARED_LOCATION,
+    },
+})
+class TieredCacheTests(BackendContractMixin, SimpleTestCase):
+    def make_worker(self):
+        return TieredCache('', {'OPTIONS': {'POLL_INTERVAL': 0}})
+
+    def setUp(self):
+        self.cache = self.make_worker()
+        self.cache.clear()
+
+    def test_local_tier_serves_hits(self):
+        """Повторное чтение не обращается к общему кэшу."""
+        self.cache.set('key', 'value')
+        caches['shared'].delete('key')
+        self.cache.poll_interval = 60
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_broadcast_invalidation(self):
+        """Изменение в одном воркере сбрасывает L1 других воркеров."""
+        other = self.make_worker()
+        self.cache.set('key', 'old')
+        self.assertEqual(other.get('key'), 'old')
+        self.cache.set('key', 'new')
+        self.assertEqual(other.get('key'), 'new')
+        self.cache.delete('key')
+        self.assertIsNone(other.get('key'))
+        other.set('key', 'again')
+        self.cache.clear()
+        self.assertIsNone(other.get('key'))
+
+    def test_single_flight(self):
+        """Отсутствующее значение вычисляется один раз при конкурентных
+        запросах из разных воркеров и потоков.
+        """
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'computed'
+
+        workers = [self.make_worker() for _ in range(2)]
+        results = []
+        threads = [
+            threading.Thread(target=lambda worker=worker: results.append(
+                worker.get_or_set('slow', compute)))
+            for worker in workers for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['computed'] * 8)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,67 @@
+import sqlite3
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase
+
+from ..db.sqlite3 import base
+
+
+class SQLiteBackendTests(TestCase):
+    def test_pragmas(self):
+        """Соединение открывается с настройками из PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0],
+                             base.PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA temp_store')
+            # 2 - MEMORY.
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def locked(self, failures):
+        """Cursor.execute, который первые failures раз сообщает о
+        заблокированной базе.
+        """
+        calls = []
+
+        def execute(cursor, query, params=None):
+            calls.append(query)
+            if len(calls) <= failures:
+                raise sqlite3.OperationalError('database is locked')
+            return cursor
+        return calls, mock.patch.object(
+            base.base.SQLiteCursorWrapper, 'execute', execute)
+
+    @mock.patch.object(base, 'BUSY_BACKOFF', 0)
+    def test_retry_in_autocommit(self):
+        """Запрос вне транзакции повторяется, пока база занята."""
+        calls, patch = self.locked(2)
+        with patch, mock.patch.object(
+                connection, 'get_autocommit', return_value=True):
+            connection.cursor().execute('SELECT 1')
+        self.assertEqual(len(calls), 3)
+
+    @mock.patch.object(base, 'BUSY_BACKOFF', 0)
+    def test_retries_are_limited(self):
+        """После busy_retries повторов ошибка пробрасывается."""
+        calls, patch = self.locked(10)
+        with patch, mock.patch.object(
+                connection, 'get_autocommit', return_value=True):
+            with self.assertRaises(OperationalError):
+                connection.cursor().execute('SELECT 1')
+        self.assertEqual(len(calls), connection.busy_retries + 1)
+
+    @mock.patch.object(base, 'BUSY_BACKOFF', 0)
+    def test_no_retry_inside_transaction(self):
+        """Внутри транзакции повторяется только BEGIN, остальные
+        запросы - нет: повторять пришлось бы всю транзакцию.
+        """
+        with transaction.atomic():
+            calls, patch = self.locked(1)
+            with patch, self.assertRaises(OperationalError):
+                connection.cursor().execute('SELECT 1')
+            self.assertEqual(calls, ['SELECT 1'])
+            calls, patch = self.locked(1)
+            with patch:
+                connection.cursor().execute('BEGIN IMMEDIATE')
+            self.assertEqual(calls, ['BEGIN IMMEDIATE'] * 2)
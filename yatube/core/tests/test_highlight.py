@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from ..highlight import (MARK_END, MARK_START, compile_query,
+                         highlight_html, marker_offsets)
+
+User = get_user_model()
+
+
+class HighlightTests(SimpleTestCase):
+    def test_query_is_escaped(self):
+        """Запрос не становится регулярным выражением."""
+        text = 'b' * 30 + '!'
+        self.assertEqual(highlight_html(text, '(a+)+$'), text)
+        self.assertNotIn("'highlight'>axb<",
+                         highlight_html('x axb y', 'a.b'))
+
+    def test_patterns_are_cached(self):
+        """Шаблон запроса компилируется один раз."""
+        self.assertIs(compile_query('Пост'), compile_query('Пост'))
+        self.assertIsNone(compile_query('!!'))
+
+    def test_html_is_escaped(self):
+        """Текст экранируется, переносы строк становятся <br>."""
+        html = highlight_html('<b>пост</b>\nвторая строка', 'пост')
+        self.assertEqual(
+            html, "&lt;b&gt;<span class='highlight'>пост</span>"
+                  "&lt;/b&gt;<br>вторая строка")
+
+    def test_snippet(self):
+        """Фрагмент начинается с предложения с совпадением и включает
+        три предложения.
+        """
+        text = 'Раз. Два. Три пост. Четыре. Пять. Шесть.'
+        self.assertEqual(
+            highlight_html(text, 'ПОСТ'),
+            " Три <span class='highlight'>пост</span>. Четыре. Пять...")
+        self.assertEqual(highlight_html(text, 'нет'), text)
+
+    def test_marker_offsets(self):
+        """Разметка индекса превращается в смещения в исходном тексте."""
+        marked = f'{MARK_START}Пост{MARK_END} и {MARK_START}посты{MARK_END}'
+        self.assertEqual(list(marker_offsets(marked)), [(0, 4), (7, 12)])
+        self.assertEqual(
+            highlight_html('Пост и посты', offsets=[(7, 12)]),
+            "Пост и <span class='highlight'>посты</span>")
+
+
+class SearchSnippetTests(TestCase):
+    def test_search_page(self):
+        """Совпадения подсвечиваются на странице поиска."""
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Первый. Пост про котов.')
+        response = self.client.get(reverse('posts:search'), {'q': 'кот*'})
+        self.assertContains(
+            response, "Пост про <span class='highlight'>котов</span>")
@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_cached(self):
+        """Повторный анонимный запрос обслуживается из кэша, с
+        заголовками для обратного прокси. Для страницы поста нужен только
+        автор поста.
+        """
+        addresses = {
+            reverse('posts:index'): 0,
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}): 1,
+            reverse('about:author'): 0,
+        }
+        for address, num_queries in addresses.items():
+            with self.subTest(address=address):
+                first = self.client.get(address)
+                with self.assertNumQueries(num_queries):
+                    second = self.client.get(address)
+                self.assertEqual(second.content, first.content)
+                self.assertIn('public', second['Cache-Control'])
+                self.assertIn('max-age=60', second['Cache-Control'])
+                self.assertIn('Cookie', second['Vary'])
+                not_modified = self.client.get(
+                    address, HTTP_IF_NONE_MATCH=second['ETag'])
+                self.assertEqual(not_modified.status_code, 304)
+
+    async def test_async_requests_cached(self):
+        """Асинхронные запросы обслуживаются из того же кэша."""
+        address = reverse('posts:index')
+        first = await self.async_client.get(address)
+        second = await self.async_client.get(address)
+        self.assertEqual(second.content, first.content)
+        self.assertTrue(first.templates)
+        self.assertEqual(second.templates, [])
+        self.assertIn('public', second['Cache-Control'])
+
+    def test_signals_invalidate(self):
+        """Новый пост сразу виден в кэшированной ленте."""
+        address = reverse('posts:index')
+        self.client.get(address)
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertContains(self.client.get(address), 'Второй пост')
+
+    def test_query_is_part_of_key(self):
+        """Страницы с разными параметрами кэшируются отдельно."""
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f'Пост {num}')
+             for num in range(10)])
+        first = self.client.get(reverse('posts:index'))
+        second = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+
+    def test_session_bypasses_cache(self):
+        """Запрос с сессией не получает анонимную страницу."""
+        address = reverse('posts:index')
+        self.client.get(address)
+        self.client.force_login(self.author)
+        response = self.client.get(address)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertIn('private', response['Cache-Control'])
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from ..perf import RequestStats, registry
+
+User = get_user_model()
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            [Post(author=cls.author, text=f'Пост {num}') for num in range(3)])
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        # Anonymous pages would be served whole by the page cache.
+        self.client.force_login(self.author)
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_server_timing(self):
+        """Замеренный запрос получает заголовок Server-Timing."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc="0 hits, 3 misses"',
+                       'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('cache;desc="3 hits, 0 misses"',
+                      response['Server-Timing'])
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    async def test_server_timing_async(self):
+        """Запросы асинхронного представления тоже замеряются."""
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(reverse('posts:index'))
+        self.assertRegex(response['Server-Timing'],
+                         r'db;dur=[\d.]+;desc="[1-9]\d* queries')
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Без замера считается только время запроса."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            metrics)
+        self.assertNotIn('yatube_db_queries', metrics)
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_metrics(self):
+        """Метрики отдаются в формате Prometheus по каждой странице."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        metrics = response.content.decode()
+        for line in (
+            '# TYPE yatube_request_duration_seconds histogram',
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2',
+            'yatube_db_queries_count{view="posts:index"} 2',
+            'yatube_fragment_cache_hits_total{view="posts:index"} 3',
+            'yatube_fragment_cache_misses_total{view="posts:index"} 3',
+        ):
+            with self.subTest(line=line):
+                self.assertIn(line, metrics)
+
+    def test_metrics_hidden(self):
+        """Метрики не видны с внешних адресов."""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """Без разрешенных адресов метрики отдаются только по токену, даже
+        запросам с 127.0.0.1 через прокси.
+        """
+        address = reverse('metrics')
+        self.assertEqual(self.client.get(address).status_code, 404)
+        self.assertEqual(self.client.get(
+            address, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.client.get(
+            address, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_duplicates(self):
+        """Повтор запроса с теми же параметрами считается дублем."""
+        stats = RequestStats()
+        with connection.execute_wrapper(stats.execute_wrapper):
+            for username in ('author', 'author', 'other'):
+                User.objects.filter(username=username).exists()
+        self.assertEqual(stats.queries, 3)
+        self.assertEqual(stats.duplicates, 1)
@@ -0,0 +1,169 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from ..db.replicas import (PIN_COOKIE, ReplicaMiddleware, copy_database,
+                           current_replica, replica_stamp, synced_key)
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def call(self, path, method='get', cookies=None, write=False):
+        """Пропустить запрос через ReplicaMiddleware и вернуть ответ и
+        базы, выбранные роутером для чтения и записи внутри запроса.
+        """
+        seen = {}
+
+        def view(request):
+            seen['read'] = router.db_for_read(Post)
+            seen['user'] = router.db_for_read(User)
+            if write:
+                seen['write'] = router.db_for_write(Comment)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        return ReplicaMiddleware(view)(request), seen
+
+    def test_marked_views_read_from_replica(self):
+        """Ленты и поиск читаются с реплики, остальные страницы и любые
+        записи идут в основную базу.
+        """
+        addresses = {
+            reverse('posts:index'): 'replica1',
+            reverse('posts:profile', args=['author']): 'replica1',
+            reverse('posts:search'): 'replica1',
+            reverse('posts:follow_index'): 'replica1',
+            reverse('api:index'): 'replica1',
+            reverse('posts:post_detail', args=[self.post.pk]): 'default',
+            reverse('posts:post_create'): 'default',
+        }
+        for address, database in addresses.items():
+            with self.subTest(address=address):
+                _, seen = self.call(address)
+                self.assertEqual(seen['read'], database)
+                # Сессии и пользователи всегда читаются из основной базы.
+                self.assertEqual(seen['user'], 'default')
+        _, seen = self.call(reverse('posts:index'), method='post')
+        self.assertEqual(seen['read'], 'default')
+        self.assertIsNone(current_replica())
+
+    def test_write_pins_to_primary(self):
+        """После записи пользователь читает основную базу, пока реплика
+        не синхронизирована после его записи, а затем cookie удаляется.
+        """
+        address = reverse('posts:add_comment', args=[self.post.pk])
+        response, seen = self.call(address, method='post', write=True)
+        self.assertEqual(seen['write'], 'default')
+        written = int(response.cookies[PIN_COOKIE].value)
+        cookies = {PIN_COOKIE: str(written)}
+        cache.set(synced_key('replica1'), written - 1)
+        response, seen = self.call(reverse('posts:index'), cookies=cookies)
+        self.assertEqual(seen['read'], 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        cache.set(synced_key('replica1'), written)
+        response, seen = self.call(reverse('posts:index'), cookies=cookies)
+        self.assertEqual(seen['read'], 'replica1')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 0)
+
+    async def test_async_requests(self):
+        """Асинхронный запрос выбирает реплику и закрепляется за основной
+        базой после записи так же, как синхронный.
+        """
+        seen = {}
+
+        async def view(request):
+            seen['read'] = router.db_for_read(Post)
+            if request.method == 'POST':
+                router.db_for_write(Comment)
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        response = await middleware(RequestFactory().post(
+            reverse('posts:add_comment', args=[self.post.pk])))
+        written = int(response.cookies[PIN_COOKIE].value)
+        request = RequestFactory().get(reverse('posts:index'))
+        request.COOKIES[PIN_COOKIE] = str(written)
+        await cache.aset(synced_key('replica1'), written)
+        response = await middleware(request)
+        self.assertEqual(seen['read'], 'replica1')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 0)
+
+    def test_unknown_sync_pins(self):
+        """Реплика с неизвестным временем синхронизации и испорченная
+        cookie не снимают закрепление.
+        """
+        for value in ('1', 'испорчено'):
+            with self.subTest(value=value):
+                _, seen = self.call(
+                    reverse('posts:index'), cookies={PIN_COOKIE: value})
+                self.assertEqual(seen['read'], 'default')
+
+    def test_sticky_after_comment(self):
+        """Комментарий через настоящий запрос закрепляет автора за
+        основной базой.
+        """
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_replica_stamp(self):
+        """Отпечаток реплики меняется после каждой синхронизации и пуст
+        при чтении основной базы.
+        """
+        self.assertEqual(replica_stamp(), '')
+        stamps = []
+
+        def view(request):
+            stamps.append(replica_stamp())
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        middleware(RequestFactory().get(reverse('posts:index')))
+        cache.set(synced_key('replica1'), 1)
+        middleware(RequestFactory().get(reverse('posts:index')))
+        self.assertEqual(stamps[0], 'replica1@0')
+        self.assertEqual(stamps[1], 'replica1@1')
+
+
+class CopyDatabaseTests(TransactionTestCase):
+    def test_copy(self):
+        """Копия базы содержит все строки основной. Внутри транзакции
+        копировать нельзя: резервное копирование ждало бы ее конца.
+        """
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        target = os.path.join(directory, 'replica.sqlite3')
+        copy_database(target)
+        copy = sqlite3.connect(target)
+        self.addCleanup(copy.close)
+        count = copy.execute(
+            f'SELECT COUNT(*) FROM {Post._meta.db_table}').fetchone()[0]
+        self.assertEqual(count, Post.objects.count())
+        with transaction.atomic(), self.assertRaises(ValueError):
+            copy_database(target)
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from ..sqlitefile import LocalSQLiteFile
+
+
+class Items(LocalSQLiteFile):
+    schema = ('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)',)
+
+
+class LocalSQLiteFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'items.sqlite3')
+
+    def test_load_and_connections(self):
+        """Файл открывается одним объектом на процесс и отдельным
+        соединением в каждом потоке.
+        """
+        items = Items.load(self.path)
+        self.assertIs(Items.load(self.path), items)
+        connections = []
+        thread = threading.Thread(
+            target=lambda: connections.append(items.connection))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], items.connection)
+
+    def test_transaction_rolls_back(self):
+        """Транзакция с ошибкой не оставляет ни одной записи."""
+        items = Items(self.path)
+        with self.assertRaises(ZeroDivisionError):
+            with items.transaction() as connection:
+                connection.executemany(
+                    'INSERT INTO items (id) VALUES (?)', [(1,), (2,)])
+                1 / 0
+        self.assertEqual(items.connection.execute(
+            'SELECT COUNT(*) FROM items').fetchone()[0], 0)
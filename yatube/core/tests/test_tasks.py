@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..tasks import Broker, Task, finish, registry, task
+
+calls = []
+
+
+@task(retries=1, backoff=0)
+def remember(value):
+    calls.append(value)
+
+
+class BrokerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.broker = Broker(os.path.join(directory, 'tasks.sqlite3'))
+        calls.clear()
+
+    def test_task_runs_inline_by_default(self):
+        """Без TASKS_BACKGROUND задача выполняется сразу."""
+        remember.enqueue(1)
+        self.assertEqual(calls, [1])
+        self.assertIs(registry[remember.name], remember)
+
+    def test_waiting_tasks_deduplicated(self):
+        """Одинаковая задача стоит в очереди один раз."""
+        self.broker.push(remember.name, [1])
+        self.broker.push(remember.name, [1])
+        self.broker.push(remember.name, [2])
+        self.assertEqual(self.broker.counts()['waiting'], 2)
+
+    def test_equal_task_waits_for_running(self):
+        """Задача, поставленная во время выполнения такой же, ждет ее
+        окончания.
+        """
+        self.broker.push(remember.name, [1])
+        [(pk, name, args, attempts)] = self.broker.claim(10)
+        self.assertEqual((args, attempts), ([1], 1))
+        self.broker.push(remember.name, [1])
+        self.assertEqual(self.broker.claim(10), [])
+        finish(self.broker, pk, name, attempts)
+        self.assertEqual(len(self.broker.claim(10)), 1)
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется, а после исчерпания попыток
+        остается в очереди как проваленная.
+        """
+        self.broker.push(remember.name, [1])
+        [(pk, name, _, attempts)] = self.broker.claim(10)
+        with self.assertLogs('core.tasks', 'WARNING'):
+            finish(self.broker, pk, name, attempts, 'Error')
+        [(pk, name, _, attempts)] = self.broker.claim(10)
+        self.assertEqual(attempts, 2)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            finish(self.broker, pk, name, attempts, 'Error')
+        self.assertEqual(self.broker.claim(10), [])
+        self.assertEqual(self.broker.counts(), {'waiting': 0, 'failed': 1})
+
+    def test_backoff(self):
+        """Повтор откладывается экспоненциально."""
+        slow = Task(None, 'slow', retries=3, backoff=2)
+        with mock.patch('random.uniform', return_value=1):
+            self.assertEqual(
+                [slow.retry_delay(attempt) for attempt in (1, 2, 3)],
+                [2, 4, 8])
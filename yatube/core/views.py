@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .perf import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -7,3 +13,26 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') in getattr(
+            settings, 'METRICS_ALLOWED_IPS', []):
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+    return request.user.is_staff
+
+
+def metrics(request):
+    """Metrics of this worker process for Prometheus. Only served to
+    METRICS_ALLOWED_IPS, requests with the METRICS_TOKEN bearer token and
+    staff.
+    """
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
@@ -0,0 +1,272 @@
+from functools import wraps
+from operator import attrgetter
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+
+from core.db.replicas import replica_reads
+
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          post_scopes, profile_scopes, static_scopes)
+from .counters import author_stats
+from .groupfeed import get_group
+from .models import Comment, Follow, Group, Post
+from .pagination import CursorPaginator
+from .search import search_posts
+from .timeline import timeline_posts
+
+User = get_user_model()
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def related_attr(name, attr):
+    """Getter of an attribute of a related object, None when the foreign
+    key is empty.
+    """
+    def get(obj):
+        related = getattr(obj, name)
+        return getattr(related, attr) if related is not None else None
+    return get
+
+
+def image_url(post):
+    return post.image.url if post.image else None
+
+
+# Fields of every resource by name: columns passed to .only() when the
+# field is requested and a getter of its value.
+POST_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'text': (('text',), attrgetter('text')),
+    'pub_date': (('pub_date',), attrgetter('pub_date')),
+    'author': (('author__username',), related_attr('author', 'username')),
+    'group': (('group__slug',), related_attr('group', 'slug')),
+    'image': (('image',), image_url),
+}
+# Lists of posts keep their ETag while posts get comments, so the number
+# of comments is only shown by the post itself.
+POST_DETAIL_FIELDS = {
+    **POST_FIELDS,
+    'comments_count': (('comments_count',), attrgetter('comments_count')),
+}
+COMMENT_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'post': (('post_id',), attrgetter('post_id')),
+    'author': (('author__username',), related_attr('author', 'username')),
+    'text': (('text',), attrgetter('text')),
+    'created': (('created',), attrgetter('created')),
+}
+GROUP_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'slug': (('slug',), attrgetter('slug')),
+    'title': (('title',), attrgetter('title')),
+    'description': (('description',), attrgetter('description')),
+}
+FOLLOW_FIELDS = {
+    'id': (('id',), attrgetter('pk')),
+    'user': (('user__username',), related_attr('user', 'username')),
+    'author': (('author__username',), related_attr('author', 'username')),
+}
+
+
+def requested_fields(request, spec):
+    """Names of the fields listed in ?fields=, all fields of the resource
+    by default.
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(spec)
+    names = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in spec]
+    if unknown or not names:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def sparse(queryset, spec, names, required=('id',)):
+    """Narrow the queryset to the columns of the named fields. Related
+    objects of the fields that were not requested are not joined.
+    """
+    columns = {column for name in names for column in spec[name][0]}
+    columns.update(required)
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize(objects, spec, names):
+    getters = [(name, spec[name][1]) for name in names]
+    return [{name: get(obj) for name, get in getters} for obj in objects]
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be a number')
+    return min(max(size, 1), API_MAX_PAGE_SIZE)
+
+
+def cursor_page(request, queryset, spec, field='pub_date', tiebreak='id'):
+    """Serialized page of the queryset located by ?cursor=, newest first,
+    with the cursors of the neighbouring pages.
+    """
+    names = requested_fields(request, spec)
+    required = {'id'}
+    if field not in queryset.query.annotations:
+        required.add(field)
+    queryset = sparse(queryset, spec, names, required)
+    page = CursorPaginator(
+        queryset, page_size(request), field, tiebreak).get_page(
+        request.GET.get('cursor'))
+    return {
+        'results': serialize(page, spec, names),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def error_response(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    """Serve GET requests only and report errors as JSON."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return error_response('Method not allowed', 405)
+        try:
+            data = view(request, *args, **kwargs)
+        except Http404:
+            return error_response('Not found', 404)
+        except ApiError as error:
+            return error_response(str(error), error.status)
+        return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+    return wrapper
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            raise ApiError('Authentication required', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@replica_reads
+@conditional_page(index_scopes)
+@api_view
+def index(request):
+    return cursor_page(request, Post.objects.for_feed(), POST_FIELDS)
+
+
+@replica_reads
+@conditional_page(group_scopes)
+@api_view
+def group_posts(request, slug):
+    group = get_group(slug)
+    return {
+        'group': serialize([group], GROUP_FIELDS, GROUP_FIELDS)[0],
+        **cursor_page(request, group.posts.for_feed(), POST_FIELDS),
+    }
+
+
+@replica_reads
+@conditional_page(profile_scopes)
+@api_view
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = author_stats(author)
+    return {
+        'author': {
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+        },
+        **cursor_page(request, author.posts.for_feed(), POST_FIELDS),
+    }
+
+
+@replica_reads
+@api_view
+def search(request):
+    """Search results are ordered by relevance, so they are paginated
+    by ?page= numbers instead of cursors.
+    """
+    names = requested_fields(request, POST_FIELDS)
+    keyword = request.GET.get('q')
+    if not keyword:
+        return {'results': [], 'next': None, 'previous': None}
+    queryset = search_posts(
+        sparse(Post.objects.for_feed(), POST_FIELDS, names), keyword)
+    page = Paginator(queryset, page_size(request)).get_page(
+        request.GET.get('page'))
+    return {
+        'results': serialize(page, POST_FIELDS, names),
+        'next': page.next_page_number() if page.has_next() else None,
+        'previous': (page.previous_page_number()
+                     if page.has_previous() else None),
+    }
+
+
+@conditional_page(post_scopes)
+@api_view
+def post_detail(request, post_id):
+    names = requested_fields(request, POST_DETAIL_FIELDS)
+    post = get_object_or_404(
+        sparse(Post.objects.for_feed(), POST_DETAIL_FIELDS, names),
+        pk=post_id)
+    return serialize([post], POST_DETAIL_FIELDS, names)[0]
+
+
+@conditional_page(post_scopes)
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return cursor_page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        field='created')
+
+
+@replica_reads
+@api_view
+@login_required
+def follow_index(request):
+    return cursor_page(
+        request, timeline_posts(request.user).for_feed(), POST_FIELDS,
+        field='timeline_date', tiebreak='timeline_post')
+
+
+@conditional_page(static_scopes)
+@api_view
+def groups(request):
+    names = requested_fields(request, GROUP_FIELDS)
+    queryset = sparse(Group.objects.order_by('title'), GROUP_FIELDS, names)
+    return {'results': serialize(queryset.iterator(), GROUP_FIELDS, names)}
+
+
+@api_view
+@login_required
+def follows(request):
+    names = requested_fields(request, FOLLOW_FIELDS)
+    queryset = sparse(Follow.objects.filter(user=request.user).order_by(
+        'id'), FOLLOW_FIELDS, names)
+    return {'results': serialize(queryset.iterator(), FOLLOW_FIELDS, names)}
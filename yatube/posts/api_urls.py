@@ -0,0 +1,21 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('', api.index, name='index'),
+    path('group/<slug:slug>/', api.group_posts, name='group_list'),
+    path('profile/<str:username>/', api.profile, name='profile'),
+    path('search/', api.search, name='search'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='post_comments'
+    ),
+    path('follow/', api.follow_index, name='follow_index'),
+    path('groups/', api.groups, name='groups'),
+    path('follows/', api.follows, name='follows'),
+]
@@ -0,0 +1,20 @@
+from django.urls import URLPattern
+
+from . import async_views, urls
+
+app_name = urls.app_name
+
+# Names of the pages answered by posts.async_views under ASGI.
+ASYNC_VIEWS = {
+    'index': async_views.index,
+    'group_list': async_views.group_posts,
+    'profile': async_views.profile,
+    'search': async_views.search,
+    'post_detail': async_views.post_detail,
+}
+
+urlpatterns = [
+    URLPattern(url.pattern, ASYNC_VIEWS[url.name], url.default_args,
+               url.name) if url.name in ASYNC_VIEWS else url
+    for url in urls.urlpatterns
+]
@@ -0,0 +1,198 @@
+"""Async versions of the read-only pages of posts.views, served under
+ASGI (see yatube.asgi_urls). Independent queries of a page are gathered.
+Django runs the async ORM calls of a request one after another in the
+thread of the request, so they overlap with other requests rather than
+with each other.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.shortcuts import aget_object_or_404, render
+
+from core.db.replicas import replica_reads
+
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          post_scopes, profile_scopes)
+from .counters import author_stats
+from .forms import CommentForm
+from .groupfeed import get_group, get_group_feed
+from .models import Comment, Post
+from .pagination import CountedPaginator, CursorPage, CursorPaginator
+from .search import search_posts
+from .views import NUM_POSTS_PER_PAGE
+from .writebehind import (pending_comments, pending_following,
+                          write_behind_enabled)
+
+User = get_user_model()
+# Keeps the OFFSET of a page read before the number of pages is known
+# within the range of database integers.
+MAX_PAGE_NUMBER = 2 ** 31
+
+# Templates read lazy relations and request.user, so the pages are
+# rendered in the thread the ORM calls of the request run in.
+arender = sync_to_async(render)
+
+
+@replica_reads
+@conditional_page(index_scopes)
+async def index(request):
+    post_list = Post.objects.for_feed()
+    page_obj = await amake_pages(request, post_list)
+    context = {
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/index.html', context)
+
+
+@replica_reads
+@conditional_page(group_scopes)
+async def group_posts(request, slug):
+    group = await sync_to_async(get_group)(slug)
+    feed = await sync_to_async(get_group_feed)(group)
+    post_list = group.posts.for_feed()
+    page_obj = await amake_pages(request, post_list, count=feed.count,
+                                 newest_ids=feed.ids)
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/group_list.html', context)
+
+
+@replica_reads
+@conditional_page(profile_scopes)
+async def profile(request, username):
+    author = await aget_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    user = await request_user(request)
+    post_list = author.posts.for_feed()
+    posts_count = (await sync_to_async(author_stats)(author)).posts_count
+    following, page_obj = await asyncio.gather(
+        is_following(user, author),
+        amake_pages(request, post_list, count=posts_count))
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+        'posts_count': posts_count,
+        'following': following,
+    }
+    return await arender(request, 'posts/profile.html', context)
+
+
+async def is_following(user, author):
+    following = None
+    if write_behind_enabled():
+        following = await sync_to_async(pending_following)(user, author)
+    if following is None:
+        following = (user.is_authenticated
+                     and await author.following.filter(user=user).aexists())
+    return following
+
+
+@replica_reads
+async def search(request):
+    keyword = request.GET.get("q", None)
+    if keyword:
+        post_list = search_posts(Post.objects.for_feed(), keyword)
+        page_obj = await amake_pages(request, post_list, cursor=False)
+    else:
+        page_obj = None
+    context = {
+        'page_obj': page_obj,
+        'keyword': keyword,
+    }
+    return await arender(request, "posts/search.html", context)
+
+
+@conditional_page(post_scopes)
+async def post_detail(request, post_id):
+    post, comment_list, user = await asyncio.gather(
+        aget_object_or_404(
+            Post.objects.for_feed().select_related('author__stats'),
+            id=post_id),
+        alist(Comment.objects.filter(post_id=post_id).select_related(
+            'author')),
+        request_user(request))
+    await sync_to_async(author_stats)(post.author)
+    if write_behind_enabled():
+        comment_list += await sync_to_async(pending_comments)(post, user)
+    form = CommentForm(request.POST or None)
+    author = user.id == post.author.id
+    context = {
+        'post': post,
+        'author': author,
+        'form': form,
+        'comments': comment_list,
+    }
+    return await arender(request, 'posts/post_detail.html', context)
+
+
+async def amake_pages(request, post_list, per_page=NUM_POSTS_PER_PAGE,
+                      cursor=None, count=None, newest_ids=None):
+    """posts.views.make_pages() with the async ORM. Without a known count the posts
+    of the requested page are read concurrently with the COUNT(*) query;
+    a page number out of range costs one more query for the posts of the
+    page actually shown.
+    """
+    if cursor is None:
+        cursor = getattr(settings, 'POSTS_CURSOR_PAGINATION', False)
+    if cursor:
+        token = request.GET.get('cursor')
+        if token or newest_ids is None or len(newest_ids) <= per_page:
+            return await CursorPaginator(post_list, per_page).aget_page(token)
+        return CursorPage(
+            await ain_order(post_list, newest_ids[:per_page]),
+            None, True, False)
+
+    def fetch(number):
+        bottom = (number - 1) * per_page
+        if newest_ids is not None and (
+                bottom + per_page <= len(newest_ids)
+                or len(newest_ids) == count):
+            return ain_order(post_list, newest_ids[bottom:bottom + per_page])
+        return alist(post_list[bottom:bottom + per_page])
+
+    number = requested_page(request)
+    if count is None:
+        count, object_list = await asyncio.gather(
+            post_list.acount(), fetch(number))
+    else:
+        object_list = await fetch(number)
+    paginator = CountedPaginator(post_list, per_page, count)
+    page = paginator.get_page(request.GET.get('page'))
+    page.page_range = list(paginator.get_elided_page_range(page.number))
+    if page.number != number:
+        object_list = await fetch(page.number)
+    page.object_list = object_list
+    return page
+
+
+def requested_page(request):
+    """Number of the page asked for if such a page may exist, 1 otherwise.
+    The paginator still decides which page is shown.
+    """
+    try:
+        number = int(request.GET.get('page') or 1)
+    except ValueError:
+        return 1
+    return number if 0 < number <= MAX_PAGE_NUMBER else 1
+
+
+async def ain_order(post_list, ids):
+    posts = await post_list.ain_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def request_user(request):
+    """request.user, loaded in a thread unless it is already. Templates
+    read request.user, which request.auser() would load a second time.
+    """
+    user = request.user
+    await sync_to_async(getattr)(user, 'is_authenticated')
+    return user
@@ -0,0 +1,502 @@
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from faker import Faker
+
+from core.db.replicas import replica_aliases
+
+from .conditional import ALL_PAGES, touch_version
+from .counters import recount_authors, recount_posts
+from .groupfeed import expire_group_feeds
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .search import get_search_backend
+from .timeline import backfill_timeline
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 1000
+TEXT_POOL_SIZE = 2000
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'search',
+         'follow_index')
+
+
+def skewed_weights(size):
+    """Zipf-like cumulative weights: a few authors and groups get most of
+    the posts and followers, like on a real site.
+    """
+    total = 0
+    weights = []
+    for rank in range(1, size + 1):
+        total += 1 / rank
+        weights.append(total)
+    return weights
+
+
+def seed(users=500, groups=20, posts=50000, comments=100000, follows=20,
+         batch_size=SEED_BATCH_SIZE, locale='ru_RU', random_seed=0,
+         progress=None):
+    """Create synthetic users, groups, posts, comments and follows with
+    bulk_create, then fill what signals would have maintained: counters,
+    timelines and the search index, and expire the cached group feeds and
+    pages like transfer.Importer. Returns the numbers of created rows.
+    """
+    progress = progress or (lambda message: None)
+    rng = random.Random(random_seed)
+    fake = Faker(locale)
+    fake.seed_instance(random_seed)
+    # Generating text is the slowest part, so a pool of texts is reused.
+    texts = [fake.text(max_nb_chars=rng.choice((100, 300, 1000)))
+             for _ in range(min(posts + comments, TEXT_POOL_SIZE))]
+    suffix = f'{int(time.time())}{rng.randrange(1000)}'
+
+    User.objects.bulk_create(
+        (User(username=f'{fake.user_name()}_{num}_{suffix}',
+              first_name=fake.first_name(), last_name=fake.last_name(),
+              password='!')
+         for num in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(
+        username__endswith=f'_{suffix}').values_list('pk', flat=True))
+    rng.shuffle(user_ids)
+    progress(f'Users: {len(user_ids)}')
+
+    Group.objects.bulk_create(
+        (Group(title=fake.catch_phrase()[:200], slug=f'g{num}-{suffix}',
+               description=fake.paragraph())
+         for num in range(groups)),
+        batch_size=batch_size,
+    )
+    group_ids = list(Group.objects.filter(
+        slug__endswith=f'-{suffix}').values_list('pk', flat=True))
+    progress(f'Groups: {len(group_ids)}')
+
+    author_weights = skewed_weights(len(user_ids))
+    group_weights = skewed_weights(len(group_ids)) if group_ids else None
+    with transaction.atomic():
+        for start in range(0, posts, batch_size):
+            size = min(batch_size, posts - start)
+            authors = rng.choices(user_ids, cum_weights=author_weights,
+                                  k=size)
+            post_groups = (rng.choices(group_ids, cum_weights=group_weights,
+                                       k=size)
+                           if group_ids else [None] * size)
+            Post.objects.bulk_create(
+                Post(text=rng.choice(texts), author_id=author_id,
+                     group_id=group_id if rng.random() < 0.8 else None)
+                for author_id, group_id in zip(authors, post_groups))
+            progress(f'Posts: {start + size}/{posts}')
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        for start in range(0, comments, batch_size):
+            size = min(batch_size, comments - start)
+            Comment.objects.bulk_create(
+                Comment(text=rng.choice(texts)[:300],
+                        post_id=rng.choice(post_ids),
+                        author_id=rng.choice(user_ids))
+                for _ in range(size))
+            progress(f'Comments: {start + size}/{comments}')
+
+    follow_count = 0
+    with transaction.atomic():
+        for user_id in user_ids:
+            wanted = min(follows, len(user_ids) - 1)
+            authors = set()
+            while len(authors) < wanted:
+                author_id = rng.choices(
+                    user_ids, cum_weights=author_weights)[0]
+                if author_id != user_id:
+                    authors.add(author_id)
+            Follow.objects.bulk_create(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors)
+            follow_count += len(authors)
+        progress(f'Follows: {follow_count}')
+
+    with transaction.atomic():
+        recount_authors()
+        recount_posts(Post.objects.filter(pk__in=post_ids))
+    progress('Counters recounted')
+    for follow in Follow.objects.filter(user_id__in=user_ids).iterator():
+        backfill_timeline(User(pk=follow.user_id), User(pk=follow.author_id))
+    progress('Timelines filled')
+    get_search_backend().rebuild(Post.objects.all())
+    progress('Search index rebuilt')
+    expire_group_feeds(group_ids)
+    touch_version(*ALL_PAGES)
+    progress('Cached pages expired')
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments,
+        'follows': follow_count,
+    }
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def view_targets(query=None):
+    """Return {view: (url, needs_login)} pointing at the busiest group,
+    author and post. The search query defaults to a word of that post.
+    """
+    group = Group.objects.alias(
+        total=Count('posts')).order_by('-total').first()
+    author = AuthorStats.objects.select_related('user').order_by(
+        '-posts_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+    if query is None and post is not None:
+        query = max(post.text.split(), key=len).strip('.,!?')
+    targets = {'index': (reverse('posts:index'), False)}
+    if group is not None:
+        targets['group_posts'] = (
+            reverse('posts:group_list', kwargs={'slug': group.slug}), False)
+    if author is not None:
+        targets['profile'] = (reverse(
+            'posts:profile', kwargs={'username': author.user.username}),
+            False)
+    if post is not None:
+        targets['post_detail'] = (reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}), False)
+    if query:
+        targets['search'] = (
+            reverse('posts:search') + '?' + urlencode({'q': query}), False)
+    targets['follow_index'] = (reverse('posts:follow_index'), True)
+    return targets
+
+
+def busiest_reader():
+    """The user following most authors, who reads follow_index."""
+    reader = Follow.objects.values('user').annotate(
+        total=Count('pk')).order_by('-total').first()
+    if reader is None:
+        return None
+    return User.objects.get(pk=reader['user'])
+
+
+def run_view(url, user, requests, warmup, concurrency):
+    """Send requests to url from concurrency threads with their own test
+    clients and database connections. Returns the latency statistics in
+    milliseconds, queries per request and requests per second.
+    """
+    latencies = []
+    queries = []
+    statuses = set()
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (num < requests % concurrency)
+                  for num in range(concurrency)]
+
+    def worker(count):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        for _ in range(warmup):
+            client.get(url)
+        local_latencies = []
+        local_queries = []
+        local_statuses = set()
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                local_latencies.append(time.perf_counter() - start)
+            local_queries.append(len(context.captured_queries))
+            local_statuses.add(response.status_code)
+        with lock:
+            statuses.update(local_statuses)
+            latencies.extend(local_latencies)
+            queries.extend(local_queries)
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(requests)
+    else:
+        threads = [threading.Thread(target=worker, args=(count,))
+                   for count in per_thread]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    return summarize(url, statuses, latencies, queries, elapsed)
+
+
+def write_requests(post, author):
+    """POST requests of the mixed load: a comment on the post and
+    following and unfollowing the author.
+    """
+    requests = []
+    if post is not None:
+        requests.append((reverse(
+            'posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий под нагрузкой'}))
+    if author is not None:
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            requests.append((reverse(
+                name, kwargs={'username': author.username}), {}))
+    return requests
+
+
+def run_mixed(urls, writes, users, requests, warmup, concurrency,
+              write_share, random_seed=0):
+    """Send GET requests to urls mixed with POST requests from writes,
+    which make up write_share of all, from concurrency threads logged in
+    as different users. Reports the latency of all requests and of the
+    writes, and the number of server errors, such as writes that failed
+    on a locked database.
+    """
+    latencies = []
+    write_latencies = []
+    statuses = set()
+    errors = []
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (num < requests % concurrency)
+                  for num in range(concurrency)]
+
+    def worker(num, count):
+        rng = random.Random(random_seed + num)
+        client = Client(raise_request_exception=False)
+        client.force_login(users[num % len(users)])
+        for _ in range(warmup):
+            client.get(rng.choice(urls))
+        local_latencies = []
+        local_writes = []
+        local_statuses = set()
+        local_errors = 0
+        for _ in range(count):
+            is_write = writes and rng.random() < write_share
+            start = time.perf_counter()
+            if is_write:
+                response = client.post(*rng.choice(writes))
+            else:
+                response = client.get(rng.choice(urls))
+            elapsed = time.perf_counter() - start
+            local_latencies.append(elapsed)
+            if is_write:
+                local_writes.append(elapsed)
+            local_statuses.add(response.status_code)
+            local_errors += response.status_code >= 500
+        with lock:
+            latencies.extend(local_latencies)
+            write_latencies.extend(local_writes)
+            statuses.update(local_statuses)
+            errors.append(local_errors)
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(0, requests)
+    else:
+        threads = [threading.Thread(target=worker, args=(num, count))
+                   for num, count in enumerate(per_thread)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    result = summarize(', '.join(urls), statuses, latencies, None, elapsed)
+    result.update({
+        'write_share': write_share,
+        'writes': len(write_latencies),
+        'write_p50_ms': (round(percentile(write_latencies, 50) * 1000, 3)
+                         if write_latencies else None),
+        'write_p99_ms': (round(percentile(write_latencies, 99) * 1000, 3)
+                         if write_latencies else None),
+        'errors': sum(errors),
+    })
+    return result
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return '; '.join(f'{name}={morsel.value}'
+                     for name, morsel in client.cookies.items())
+
+
+async def asgi_get(application, url, cookie):
+    """Send a GET through the ASGI application, return the status."""
+    path, _, query = url.partition('?')
+    headers = [(b'host', b'testserver')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path,
+        'query_string': query.encode(), 'headers': headers,
+        'http_version': '1.1', 'scheme': 'http',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    response = {}
+    requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected until the response is sent.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    await application(scope, receive, send)
+    return response.get('status')
+
+
+def run_view_asgi(url, user, requests, warmup, concurrency):
+    """Send requests to url through settings.ASGI_APPLICATION in one
+    process, at most concurrency at a time. Queries are run by the
+    application's own threads and are not counted.
+    """
+    application = import_string(settings.ASGI_APPLICATION)
+    cookie = session_cookie(user) if user is not None else ''
+    latencies = []
+    statuses = set()
+
+    async def timed_get(semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            statuses.add(await asgi_get(application, url, cookie))
+            latencies.append(time.perf_counter() - start)
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(asgi_get(application, url, cookie)
+                               for _ in range(warmup)))
+        await asyncio.gather(*(timed_get(semaphore)
+                               for _ in range(requests)))
+
+    start = time.perf_counter()
+    with asgi_connections():
+        asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    return summarize(url, statuses, latencies, None, elapsed)
+
+
+@contextmanager
+def asgi_connections():
+    """Close database connections after every request, as yatube.asgi
+    does unless DB_CONN_MAX_AGE is set. The settings of this process
+    were read without that default.
+    """
+    if 'DB_CONN_MAX_AGE' in os.environ:
+        yield
+        return
+    databases = [connections.settings[alias] for alias in connections]
+    max_ages = [database['CONN_MAX_AGE'] for database in databases]
+    for database in databases:
+        database['CONN_MAX_AGE'] = 0
+    try:
+        yield
+    finally:
+        for database, max_age in zip(databases, max_ages):
+            database['CONN_MAX_AGE'] = max_age
+
+
+def summarize(url, statuses, latencies, queries, elapsed):
+    return {
+        'url': url,
+        'status': sorted(statuses),
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'queries_per_request': (round(sum(queries) / len(queries), 2)
+                                if queries else None),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def run(views=VIEWS, requests=200, warmup=5, concurrency=1, login=False,
+        query=None, clear_cache=False, asgi=False, mixed=0, progress=None):
+    """Benchmark the posts views and return a JSON-serializable report.
+    With asgi=True requests go through the ASGI application instead of
+    test clients in threads. With mixed set to a share of writes, the
+    views are then read together with comments and follows sent by
+    logged in users (see run_mixed()).
+    """
+    progress = progress or (lambda message: None)
+    reader = busiest_reader()
+    if reader is None:
+        reader = User.objects.order_by('pk').first()
+    targets = view_targets(query)
+    report = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'replicas': replica_aliases(),
+        'requests': requests,
+        'warmup': warmup,
+        'concurrency': concurrency,
+        'login': login,
+        'server': 'asgi' if asgi else 'test client',
+        'mixed': mixed,
+        'data': {
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'comments': Comment.objects.count(),
+            'follows': Follow.objects.count(),
+        },
+        'views': {},
+    }
+    for name in views:
+        if name not in targets:
+            progress(f'{name}: skipped, no data')
+            continue
+        url, needs_login = targets[name]
+        if clear_cache:
+            cache.clear()
+        user = reader if needs_login or login else None
+        measure = run_view_asgi if asgi else run_view
+        result = measure(url, user, requests, warmup, concurrency)
+        report['views'][name] = result
+        queries = result['queries_per_request']
+        progress(f"{name}: p50 {result['p50_ms']} ms, "
+                 f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                 + (f'{queries} queries, ' if queries is not None else '')
+                 + f"{result['rps']} rps")
+    if mixed:
+        if clear_cache:
+            cache.clear()
+        urls = [targets[name][0] for name in views if name in targets]
+        users = list(User.objects.order_by('pk')[:concurrency])
+        author = AuthorStats.objects.select_related('user').order_by(
+            '-posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        result = run_mixed(
+            urls, write_requests(post, author and author.user), users,
+            requests, warmup, concurrency, mixed)
+        report['mixed_load'] = result
+        progress(f"mixed: p50 {result['p50_ms']} ms, "
+                 f"p99 {result['p99_ms']} ms, {result['writes']} writes, "
+                 f"write p99 {result['write_p99_ms']} ms, "
+                 f"{result['errors']} errors, {result['rps']} rps")
+    return report
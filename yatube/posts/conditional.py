@@ -0,0 +1,118 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from core.db.replicas import replica_stamp
+
+from .fragments import get_versions, new_version, version_key
+from .models import Post
+
+# Group and profile pages are versioned by slug and username, which are
+# known before any query. This version is bumped by changes shown on every
+# page: names of users and groups, slugs and usernames themselves.
+ALL_PAGES = ('pages', 0)
+
+
+def touch_version(kind, pk):
+    """Move the version of a page scope forward to the current time in
+    milliseconds, which also serves as its Last-Modified time.
+    """
+    key = version_key(kind, pk)
+    current = cache.get(key) or 0
+    cache.set(key, max(new_version(), current + 1), None)
+
+
+def expire_post_pages(post, previous_group_slug=None):
+    """Expire every page showing the post."""
+    touch_version('index_page', 0)
+    touch_version('post_page', post.pk)
+    touch_version('profile_page', post.author.username)
+    slugs = {previous_group_slug}
+    if post.group_id is not None:
+        slugs.add(post.group.slug)
+    for slug in slugs - {None}:
+        touch_version('group_page', slug)
+
+
+def page_stamp(scopes, user):
+    """Return (ETag, Last-Modified) of a page built from the given
+    (kind, pk) scopes for the user, None for a request that has not been
+    authenticated yet. Pages differ by user, so the ETag does too.
+    """
+    keys = [version_key(*scope) for scope in (ALL_PAGES, *scopes)]
+    versions = get_versions(keys)
+    source = '.'.join(str(versions[key]) for key in keys)
+    user_id = user.pk if user is not None else None
+    etag = hashlib.md5(
+        f'{source}:{user_id or 0}:{replica_stamp()}'.encode()).hexdigest()
+    modified = datetime.fromtimestamp(
+        max(versions.values()) / 1000, timezone.utc)
+    return etag, modified
+
+
+def conditional_page(scopes):
+    """Answer GET with 304 Not Modified when none of the scopes returned by
+    scopes(request, **view_kwargs) changed since the client got the page.
+    The view itself is not called then. The stamp function is kept as
+    the page_stamp attribute of the view for the anonymous page cache.
+
+    condition() calls the stamp functions synchronously, also for async
+    views. The stamp of those is taken in a thread before, so that its
+    cache reads and queries do not block the event loop.
+    """
+    def stamp(request, *args, **kwargs):
+        if not hasattr(request, 'page_stamp'):
+            request.page_stamp = page_stamp(
+                scopes(request, *args, **kwargs),
+                getattr(request, 'user', None))
+        return request.page_stamp
+
+    def etag(request, *args, **kwargs):
+        return stamp(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return stamp(request, *args, **kwargs)[1]
+
+    def stamped(conditional):
+        @wraps(conditional)
+        async def wrapper(request, *args, **kwargs):
+            await sync_to_async(stamp)(request, *args, **kwargs)
+            return await conditional(request, *args, **kwargs)
+        return wrapper
+
+    def decorator(view):
+        wrapper = vary_on_cookie(condition(
+            etag_func=etag, last_modified_func=last_modified)(view))
+        if iscoroutinefunction(view):
+            wrapper = stamped(wrapper)
+        wrapper.page_stamp = stamp
+        return wrapper
+    return decorator
+
+
+def static_scopes(request):
+    return []
+
+
+def index_scopes(request):
+    return [('index_page', 0)]
+
+
+def group_scopes(request, slug):
+    return [('group_page', slug)]
+
+
+def profile_scopes(request, username):
+    return [('profile_page', username)]
+
+
+def post_scopes(request, post_id):
+    # The page shows the number of posts of the author.
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True).first()
+    return [('post_page', post_id), ('profile_page', username)]
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def count_of(queryset, field):
+    """Correlated subquery counting rows of queryset that point with field
+    to the outer row.
+    """
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()), 0)
+
+
+def change_author_counter(user_id, field, delta):
+    """Atomically add delta to one of the AuthorStats counters. A missing
+    row is created and counted from scratch, unless the author is being
+    deleted. Counters never go below zero, the recount command repairs
+    such drift.
+    """
+    updated = AuthorStats.objects.filter(
+        user_id=user_id, **{f'{field}__gte': -delta}).update(
+        **{field: F(field) + delta})
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        recount_authors(AuthorStats.objects.filter(user_id=user_id))
+
+
+def author_stats(user):
+    """AuthorStats of the user. Users added with bulk_create() or imported
+    may have none, then it is created and counted from scratch.
+    """
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats, created = AuthorStats.objects.get_or_create(user_id=user.pk)
+        if created:
+            recount_authors(AuthorStats.objects.filter(user_id=user.pk))
+            stats.refresh_from_db()
+        user.stats = stats
+        return stats
+
+
+def change_comments_counter(post_id, delta):
+    Post.objects.filter(pk=post_id, comments_count__gte=-delta).update(
+        comments_count=F('comments_count') + delta)
+
+
+def recount_authors(queryset=None):
+    if queryset is None:
+        existing = AuthorStats.objects.values('user_id')
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=user_id) for user_id in User.objects.exclude(
+                pk__in=existing).values_list('pk', flat=True)],
+            batch_size=500,
+        )
+        queryset = AuthorStats.objects.all()
+    return queryset.update(
+        posts_count=count_of(Post.objects.all(), 'author'),
+        followers_count=count_of(Follow.objects.all(), 'author'),
+    )
+
+
+def recount_posts(queryset=None):
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.update(
+        comments_count=count_of(Comment.objects.all(), 'post'))
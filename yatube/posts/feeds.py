@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr, truncatechars
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          profile_scopes)
+from .models import Group, Post
+
+User = get_user_model()
+
+
+def feed_size():
+    return getattr(settings, 'POSTS_FEED_SIZE', 50)
+
+
+class PostsFeed(Feed):
+    """RSS feed of the newest posts of the site. Posts are read from the
+    database cursor with .iterator() and written out one by one, no
+    template is rendered per item.
+    """
+    title = 'Yatube: новые посты'
+    description = 'Последние публикации на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).for_feed()[:feed_size()].iterator()
+
+    def item_title(self, item):
+        return truncatechars(item.text, 50)
+
+    def item_description(self, item):
+        return linebreaksbr(item.text)
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group_id is not None else []
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class ProfileFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: {obj.get_full_name() or obj.username}'
+
+    def description(self, obj):
+        return f'Посты пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class GroupAtomFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class ProfileAtomFeed(AtomMixin, ProfileFeed):
+    pass
+
+
+index_rss = conditional_page(index_scopes)(PostsFeed())
+index_atom = conditional_page(index_scopes)(PostsAtomFeed())
+group_rss = conditional_page(group_scopes)(GroupFeed())
+group_atom = conditional_page(group_scopes)(GroupAtomFeed())
+profile_rss = conditional_page(profile_scopes)(ProfileFeed())
+profile_atom = conditional_page(profile_scopes)(ProfileAtomFeed())
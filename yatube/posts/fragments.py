@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def fragment_timeout():
+    return getattr(settings, 'POSTS_FRAGMENT_TIMEOUT', 60 * 60)
+
+
+def version_key(kind, pk):
+    return f'version:{kind}:{pk}'
+
+
+def new_version():
+    """Versions start from the current time in milliseconds, so that after
+    an eviction of a counter its old fragments are never matched again.
+    """
+    return int(time.time() * 1000)
+
+
+def bump_version(kind, pk):
+    key = version_key(kind, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def article_keys(posts, variant):
+    """Return dict of cache keys of rendered articles by post id. A key
+    changes whenever the post, its author or its group is saved.
+    """
+    sources = {
+        post.pk: (version_key('post', post.pk),
+                  version_key('user', post.author_id),
+                  version_key('group', post.group_id))
+        for post in posts
+    }
+    versions = get_versions(
+        {key for keys in sources.values() for key in keys})
+    return {
+        pk: 'article:{}:{}:{}'.format(
+            pk, variant, '.'.join(str(versions[key]) for key in keys))
+        for pk, keys in sources.items()
+    }
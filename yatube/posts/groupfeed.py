@@ -0,0 +1,187 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+
+from .fragments import new_version
+from .models import Group, Post
+
+GROUP_TIMEOUT = 60 * 60 * 24
+
+
+def group_feed_size():
+    return getattr(settings, 'POSTS_GROUP_FEED_SIZE', 100)
+
+
+def group_key(slug):
+    return f'group:slug:{slug}'
+
+
+def feed_key(group_id):
+    return f'group_feed:{group_id}'
+
+
+def generation_key(group_id):
+    return f'group_feed:{group_id}:generation'
+
+
+class GroupFeed(NamedTuple):
+    """Ids of the newest posts of a group, newest first, and the number
+    of all its posts.
+    """
+    ids: list
+    count: int
+
+
+def get_group(slug):
+    """Group by slug from the cache, 404 when there is no such group.
+    Like the feeds, it is read from the primary database: the cached copy
+    is shown to the readers of every replica.
+    """
+    key = group_key(slug)
+    group = cache.get(key)
+    if group is None:
+        group = get_object_or_404(
+            Group.objects.using(DEFAULT_DB_ALIAS), slug=slug)
+        cache.set(key, group, GROUP_TIMEOUT)
+    return group
+
+
+def forget_group(*slugs):
+    cache.delete_many([group_key(slug) for slug in slugs if slug])
+
+
+def feed_posts(group_id):
+    """Posts of the group in the order of the feed, read from the primary
+    database. A feed read from a replica that has not got the latest
+    changes yet would be cached under the current generation.
+    """
+    return Post.objects.using(DEFAULT_DB_ALIAS).filter(
+        group_id=group_id).order_by('-pub_date', '-id')
+
+
+def get_group_feed(group):
+    """Return the GroupFeed of the group with one cache fetch. A missing
+    or outdated one is read from the database and cached.
+
+    The cached feed is tagged with the generation of the group, which
+    moves forward after every commit changing its posts. A feed read from
+    the database is tagged with the generation seen before the read, so
+    a feed that may have missed a change is never used.
+    """
+    keys = [generation_key(group.pk), feed_key(group.pk)]
+    cached = cache.get_many(keys)
+    generation = cached.get(keys[0])
+    if generation is None:
+        cache.add(keys[0], new_version(), None)
+        generation = cache.get(keys[0])
+    entry = cached.get(keys[1])
+    if entry is not None and entry[0] == generation:
+        return GroupFeed(entry[1], entry[2])
+    size = group_feed_size()
+    posts = feed_posts(group.pk)
+    ids = list(posts.values_list('id', flat=True)[:size])
+    count = len(ids) if len(ids) < size else posts.count()
+    cache.set(keys[1], (generation, ids, count), GROUP_TIMEOUT)
+    return GroupFeed(ids, count)
+
+
+def next_generation(group_id):
+    key = generation_key(group_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = new_version()
+        cache.set(key, generation, None)
+        return generation
+
+
+def change_feed(group_id, change):
+    """Move the generation of the group forward and apply change(ids,
+    count) to its cached feed if the feed is of the previous generation.
+    change returns the new (ids, count), or None when the feed has to be
+    read from the database again. Feeds of a later generation are left
+    alone: they were read after this change was committed.
+    """
+    generation = next_generation(group_id)
+    key = feed_key(group_id)
+    entry = cache.get(key)
+    if entry is None or entry[0] >= generation:
+        return
+    changed = None
+    if entry[0] == generation - 1:
+        changed = change(entry[1], entry[2])
+    if changed is None:
+        cache.delete(key)
+    else:
+        cache.set(key, (generation, *changed), GROUP_TIMEOUT)
+
+
+def prepend(post_id):
+    def change(ids, count):
+        # A feed read from the database after the commit has it already.
+        if post_id in ids:
+            return ids, count
+        return [post_id, *ids][:group_feed_size()], count + 1
+    return change
+
+
+def remove(post_id):
+    def change(ids, count):
+        # Without the post among the newest ones there is no telling
+        # whether the count includes it.
+        if post_id not in ids:
+            return None
+        return [pk for pk in ids if pk != post_id], count - 1
+    return change
+
+
+def invalidate(ids, count):
+    return None
+
+
+def on_commit(group_id, change):
+    if group_id is not None:
+        transaction.on_commit(lambda: change_feed(group_id, change))
+
+
+def post_added(post):
+    """Put a new post at the top of its group feed once it is committed."""
+    on_commit(post.group_id, prepend(post.pk))
+
+
+def post_moved(post, previous_group_id):
+    """Take the post out of the feed of its previous group. Its place in
+    the feed of the new group is not known, that feed is read again.
+    """
+    on_commit(previous_group_id, remove(post.pk))
+    on_commit(post.group_id, invalidate)
+
+
+def post_removed(post):
+    # Called before Model.delete() resets the primary key.
+    on_commit(post.group_id, remove(post.pk))
+
+
+def expire_group_feeds(group_ids):
+    """Make the feeds of the groups be read from the database again, e.g.
+    after posts were added without signals.
+    """
+    for group_id in group_ids:
+        change_feed(group_id, invalidate)
+
+
+def warm_group_feeds(limit=None):
+    """Cache the groups with most posts and their feeds, return them."""
+    groups = Group.objects.alias(
+        total=Count('posts')).order_by('-total', 'pk')
+    if limit is not None:
+        groups = groups[:limit]
+    groups = list(groups)
+    for group in groups:
+        cache.set(group_key(group.slug), group, GROUP_TIMEOUT)
+        get_group_feed(group)
+    return groups
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import VIEWS, run
+
+
+class Command(BaseCommand):
+    help = ('Measure latency percentiles, queries per request and requests '
+            'per second of the posts views and write the results as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=VIEWS,
+            help='Views to measure, all of them by default.')
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of measured requests per view.')
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Number of unmeasured requests per client before the run.')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of threads sending requests at the same time.')
+        parser.add_argument(
+            '--login', action='store_true',
+            help='Send every request as a logged in user.')
+        parser.add_argument('--query', help='Search query.')
+        parser.add_argument(
+            '--clear-cache', action='store_true',
+            help='Clear the cache before measuring every view.')
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Send requests through the ASGI application, up to '
+                 '--concurrency at a time, instead of test clients.')
+        parser.add_argument(
+            '--mixed', type=float, default=0, metavar='SHARE',
+            help='Then read the views together with comments and follows '
+                 'making up SHARE of the requests, e.g. 0.2.')
+        parser.add_argument(
+            '--output', '-o',
+            help='File to write the JSON results to, stdout by default.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError(
+                'Requests and concurrency must be positive numbers.')
+        if not 0 <= options['mixed'] <= 1:
+            raise CommandError('Share of writes must be between 0 and 1.')
+        # Without a file the JSON goes to stdout, so progress does not.
+        progress = (self.stdout.write if options['output']
+                    else self.stderr.write)
+        report = run(
+            views=options['views'], requests=options['requests'],
+            warmup=options['warmup'], concurrency=options['concurrency'],
+            login=options['login'], query=options['query'],
+            clear_cache=options['clear_cache'], asgi=options['asgi'],
+            mixed=options['mixed'], progress=progress)
+        data = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data + '\n')
+            self.stdout.write(self.style.SUCCESS(
+                f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(data)
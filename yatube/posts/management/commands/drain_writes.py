@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.writebehind import WRITE_BATCH_SIZE, drain, get_queue
+
+
+class Command(BaseCommand):
+    help = ('Write the queued comments, follows and unfollows to the '
+            'database in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=WRITE_BATCH_SIZE,
+            help='Number of queued writes applied in one transaction.')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep draining, checking the queue every INTERVAL seconds, '
+                 'instead of stopping when it is empty.')
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        total = 0
+        while True:
+            applied = drain(queue, options['batch_size'])
+            total += applied
+            if applied:
+                self.stdout.write(f'Applied writes: {total}')
+                continue
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Queue drained, applied writes: {total}'))
@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.groupfeed import feed_posts, group_feed_size
+from posts.models import Comment, Post
+from posts.pagination import NEXT, PREVIOUS, CursorPaginator, encode_cursor
+from posts.search import search_posts
+from posts.timeline import timeline_posts
+from posts.views import NUM_POSTS_PER_PAGE
+
+User = get_user_model()
+
+SAMPLE_ID = 1
+
+
+def cursor_querysets(name, queryset, model=Post, field='pub_date',
+                     tiebreak='id'):
+    """(name, queryset) of the first, next and previous page of queryset
+    in cursor pagination.
+    """
+    paginator = CursorPaginator(
+        queryset, NUM_POSTS_PER_PAGE, field, tiebreak)
+    sample = model(id=SAMPLE_ID)
+    setattr(sample, field, timezone.now())
+    page = slice(0, NUM_POSTS_PER_PAGE + 1)
+    querysets = [(f'{name} cursor', paginator.locate(None)[0][page])]
+    for direction, label in ((NEXT, 'next'), (PREVIOUS, 'previous')):
+        token = encode_cursor(sample, direction, field)
+        querysets.append(
+            (f'{name} cursor {label}', paginator.locate(token)[0][page]))
+    return querysets
+
+
+def feed_querysets():
+    """Return (name, queryset, sort_allowed) for every query issued by the
+    feed views, the cursor pages of the feeds and the API and the cached
+    group feeds. Plans do not depend on the data, so placeholder ids are
+    used. Relevance ranking of search can not be served by an index.
+    """
+    page = slice(0, NUM_POSTS_PER_PAGE)
+    user = User(id=SAMPLE_ID)
+    cursors = [
+        *cursor_querysets('index', Post.objects.for_feed()),
+        *cursor_querysets(
+            'group_posts', Post.objects.filter(group_id=SAMPLE_ID).for_feed()),
+        *cursor_querysets(
+            'profile', Post.objects.filter(author_id=SAMPLE_ID).for_feed()),
+        *cursor_querysets(
+            'follow_index', timeline_posts(user).for_feed(),
+            field='timeline_date', tiebreak='timeline_post'),
+        *cursor_querysets(
+            'api comments', Comment.objects.filter(post_id=SAMPLE_ID),
+            Comment, 'created'),
+    ]
+    return [
+        ('index',
+         Post.objects.for_feed()[page], False),
+        ('group_posts',
+         Post.objects.filter(group_id=SAMPLE_ID).for_feed()[page],
+         False),
+        ('group feed',
+         feed_posts(SAMPLE_ID).values_list('id', flat=True)[
+             :group_feed_size()],
+         False),
+        ('profile',
+         Post.objects.filter(author_id=SAMPLE_ID).for_feed()[page],
+         False),
+        ('post_detail comments',
+         Comment.objects.filter(post_id=SAMPLE_ID).select_related('author'),
+         False),
+        ('follow_index',
+         timeline_posts(user).for_feed()[page],
+         False),
+        ('search',
+         search_posts(Post.objects.for_feed(), 'пост')[page],
+         True),
+        *((name, queryset, False) for name, queryset in cursors),
+    ]
+
+
+def plan_problems(plan, sort_allowed):
+    """Return plan rows that mean a full table scan or a temporary B-tree
+    built to sort the result.
+    """
+    problems = []
+    for detail in plan:
+        full_scan = (detail.startswith('SCAN')
+                     and ' USING ' not in detail
+                     and 'VIRTUAL TABLE' not in detail)
+        temp_sort = 'USE TEMP B-TREE' in detail and not sort_allowed
+        if full_scan or temp_sort:
+            problems.append(detail)
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN QUERY PLAN for the feed queries and report full '
+            'table scans and temporary sorts. Exits with an error if any '
+            'are found.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN requires SQLite.')
+        failed = []
+        for name, queryset, sort_allowed in feed_querysets():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            problems = plan_problems(plan, sort_allowed)
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(f'{name}: {"FAIL" if problems else "OK"}'))
+            for detail in plan:
+                self.stdout.write(f'    {detail}')
+            if problems:
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Full scan or temp sort in: ' + ', '.join(failed))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (COPY_WORKERS, FORMATS, KINDS, TRANSFER_BATCH_SIZE,
+                            export_data)
+
+
+def guess_format(path):
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+class Command(BaseCommand):
+    help = ('Export users, groups, posts, comments and follows as JSON lines '
+            'or CSV, e.g. to move them to another environment with '
+            'import_posts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='File to write the records to, stdout by default.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Format of the file, by its extension by default.')
+        parser.add_argument(
+            '--kinds', nargs='+', choices=KINDS, default=KINDS,
+            help='Kinds of records to export, all of them by default.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=TRANSFER_BATCH_SIZE,
+            help='Number of rows read from the database at once.')
+        parser.add_argument(
+            '--media-dir',
+            help='Directory to copy the images of the posts to.')
+        parser.add_argument(
+            '--workers', type=int, default=COPY_WORKERS,
+            help='Number of threads copying images.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or guess_format(output)
+        # Records written to stdout must not mix with the progress.
+        progress = self.stdout.write if output != '-' else self.stderr.write
+        if output == '-':
+            counts = self.export(self.stdout, fmt, options, progress)
+        else:
+            with open(output, 'w', encoding='utf-8', newline='') as file:
+                counts = self.export(file, fmt, options, progress)
+        progress(self.style.SUCCESS('Exported ' + ', '.join(
+            f'{kind}: {count}' for kind, count in counts.items())))
+
+    def export(self, stream, fmt, options, progress):
+        return export_data(
+            stream, fmt, kinds=options['kinds'],
+            chunk_size=options['chunk_size'],
+            media_dir=options['media_dir'], workers=options['workers'],
+            progress=progress)
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from posts.models import Post
+from posts.thumbnails import make_thumbnail
+
+
+def make_thumbnails(post_ids):
+    """Runs in a worker process, returns the number of thumbnails made."""
+    made = 0
+    for post in Post.objects.filter(pk__in=post_ids).exclude(image=''):
+        make_thumbnail(post)
+        made += 1
+    return made
+
+
+class Command(BaseCommand):
+    help = ('Generate missing thumbnails and responsive variants of post '
+            'images in parallel.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of worker processes, CPU count by default. '
+                 'With 0 everything runs in the current process.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help='Number of posts handled by a worker at once.')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate thumbnails that are already stored.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(Q(thumbnail='') | Q(image_variants=''))
+        post_ids = list(posts.order_by('pk').values_list('pk', flat=True))
+        size = options['chunk_size']
+        chunks = [post_ids[i:i + size] for i in range(0, len(post_ids), size)]
+        if options['processes'] == 0:
+            made = self.report(map(make_thumbnails, chunks), len(post_ids))
+        else:
+            # Spawned workers do not inherit connections of the parent,
+            # SQLite ones included, nor a copy of its threads and locks.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                    options['processes'], mp_context=get_context('spawn'),
+                    initializer=django.setup) as executor:
+                made = self.report(
+                    executor.map(make_thumbnails, chunks), len(post_ids))
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails: {made}'))
+
+    def report(self, counts, total):
+        made = 0
+        for count in counts:
+            made += count
+            self.stdout.write(f'Thumbnails: {made}/{total}')
+        return made
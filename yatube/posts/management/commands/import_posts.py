@@ -0,0 +1,51 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import (COPY_WORKERS, FORMATS, TRANSFER_BATCH_SIZE,
+                            import_data)
+
+from .export_posts import guess_format
+
+
+class Command(BaseCommand):
+    help = ('Import users, groups, posts, comments and follows written by '
+            'export_posts. Missing thumbnails can be made afterwards with '
+            'generate_thumbnails.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='File to read the records from, stdin by default.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Format of the file, by its extension by default.')
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE,
+            help='Number of rows inserted in one transaction.')
+        parser.add_argument(
+            '--media-dir',
+            help='Directory to copy the images of the posts from.')
+        parser.add_argument(
+            '--workers', type=int, default=COPY_WORKERS,
+            help='Number of threads copying images.')
+
+    def handle(self, *args, **options):
+        source = options['input']
+        fmt = options['format'] or guess_format(source)
+        try:
+            if source == '-':
+                counts = self.load(sys.stdin, fmt, options)
+            else:
+                with open(source, encoding='utf-8', newline='') as file:
+                    counts = self.load(file, fmt, options)
+        except (ValueError, KeyError) as error:
+            raise CommandError(f'Invalid record: {error}')
+        self.stdout.write(self.style.SUCCESS('Imported ' + ', '.join(
+            f'{kind}: {count}' for kind, count in counts.items())))
+
+    def load(self, stream, fmt, options):
+        return import_data(
+            stream, fmt, batch_size=options['batch_size'],
+            media_dir=options['media_dir'], workers=options['workers'],
+            progress=self.stdout.write)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import SEARCH_BATCH_SIZE, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of posts from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SEARCH_BATCH_SIZE,
+            help='Number of posts inserted into the index at once.')
+
+    def handle(self, *args, **options):
+        total = get_search_backend().rebuild(
+            Post.objects.all(), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed posts: {total}'))
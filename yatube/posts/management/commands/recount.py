@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_authors, recount_posts
+
+
+class Command(BaseCommand):
+    help = ('Recalculate stored counters of posts, followers and comments '
+            'to repair any drift.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = recount_authors()
+            posts = recount_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted authors: {authors}, posts: {posts}'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import SEED_BATCH_SIZE, seed
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic users, groups, posts, '
+            'comments and follows for benchmarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Number of authors followed by every new user.')
+        parser.add_argument(
+            '--batch-size', type=int, default=SEED_BATCH_SIZE,
+            help='Number of rows inserted at once.')
+        parser.add_argument('--locale', default='ru_RU')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the random generators, for repeatable data.')
+
+    def handle(self, *args, **options):
+        created = seed(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], batch_size=options['batch_size'],
+            locale=options['locale'], random_seed=options['seed'],
+            progress=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            'Created ' + ', '.join(
+                f'{kind}: {count}' for kind, count in created.items())))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.groupfeed import warm_group_feeds
+
+
+class Command(BaseCommand):
+    help = ('Cache the groups with most posts and the ids of their newest '
+            'posts, e.g. after a deploy or a cache flush.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Number of groups to warm, all of them by default.')
+
+    def handle(self, *args, **options):
+        groups = warm_group_feeds(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed group feeds: {len(groups)}'))
@@ -13,6 +13,6 @@ class Migration(migrations.Migration):
     operations = [
         migrations.AddConstraint(
             model_name='follow',
-            constraint=models.CheckConstraint(check=models.Q(_negated=True, author=django.db.models.expressions.F('user')), name='check_start_date'),
+            constraint=models.CheckConstraint(condition=models.Q(_negated=True, author=django.db.models.expressions.F('user')), name='check_start_date'),
         ),
     ]
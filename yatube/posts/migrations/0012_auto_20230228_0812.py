@@ -17,6 +17,6 @@ class Migration(migrations.Migration):
         ),
         migrations.AddConstraint(
             model_name='follow',
-            constraint=models.CheckConstraint(check=models.Q(_negated=True, author=django.db.models.expressions.F('user')), name='can not subscribe to yourself'),
+            constraint=models.CheckConstraint(condition=models.Q(_negated=True, author=django.db.models.expressions.F('user')), name='can not subscribe to yourself'),
         ),
     ]
@@ -1,5 +1,8 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 
 
 User = get_user_model()
@@ -24,6 +27,12 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Posts with everything an article in a feed shows about them."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -53,14 +62,46 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Адрес миниатюры'
+    )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def variants(self):
+        """Manifest of resized copies of the image: srcset by MIME type."""
+        return json.loads(self.image_variants) if self.image_variants else {}
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            # Feeds are ordered by -pub_date, -id: id breaks ties of the
+            # date for cursor pagination and the cached group feeds.
+            models.Index(fields=['-pub_date', '-id'], name='post_pub_date'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date'),
+        ]
 
 
 class Comment(models.Model):
@@ -89,8 +130,13 @@ class Comment(models.Model):
         return self.text
 
     class Meta:
+        ordering = ('created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created'),
+        ]
 
 
 class Follow(models.Model):
@@ -115,8 +161,64 @@ class Follow(models.Model):
         verbose_name_plural = 'Подписки'
         constraints = [
             models.CheckConstraint(
-                check=~models.Q(author=models.F('user')),
+                condition=~models.Q(author=models.F('user')),
                 name='can not subscribe to yourself'),
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique subscription')
         ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    def __str__(self):
+        return str(f'{self.post} в ленте {self.user}')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique timeline entry')
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+
+    def __str__(self):
+        return str(f'Статистика {self.user}')
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
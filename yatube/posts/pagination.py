@@ -0,0 +1,155 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT, PREVIOUS = 'n', 'p'
+
+
+class CountedPaginator(Paginator):
+    """Paginator for a list whose length is already known, e.g. from
+    a stored counter, so that no COUNT(*) query is issued.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+def encode_cursor(obj, direction, field='pub_date'):
+    raw = f'{direction}|{getattr(obj, field).isoformat()}|{obj.pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return a (direction, pub_date, id) tuple stored in the token or None
+    if the token is missing or malformed.
+    """
+    if not token:
+        return None
+    try:
+        raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """A page of posts located by a (pub_date, id) keyset instead of an
+    offset. Mimics the parts of django.core.paginator.Page used by
+    templates.
+    """
+    cursor_based = True
+
+    def __init__(self, object_list, token, has_next, has_previous,
+                 field='pub_date'):
+        self.object_list = object_list
+        self.token = token or ''
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.field = field
+
+    def __repr__(self):
+        return f'<CursorPage {self.token or "first"}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1], NEXT, self.field)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0], PREVIOUS, self.field)
+        return None
+
+
+class CursorPaginator:
+    """Paginate a Post QuerySet newest first by (pub_date, id). A page is
+    fetched with a single LIMIT query, so neither COUNT(*) nor OFFSET is
+    ever issued and the cost of a page does not depend on its depth.
+    Other models are paginated by another date field. Ties of the date
+    are broken by tiebreak, a column holding the primary key, e.g. the
+    post of a timeline entry, so that the index ordering the feed can
+    end with it.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 tiebreak='id'):
+        self.object_list = object_list.order_by()
+        self.per_page = per_page
+        self.field = field
+        self.tiebreak = tiebreak
+
+    def get_page(self, token):
+        queryset, *args = self.locate(token)
+        return self._page(list(queryset[:self.per_page + 1]), *args)
+
+    async def aget_page(self, token):
+        queryset, *args = self.locate(token)
+        posts = [post async for post in queryset[:self.per_page + 1]]
+        return self._page(posts, *args)
+
+    def locate(self, token):
+        """Return the QuerySet of the page in reading order and the rest
+        of the arguments of _page().
+
+        Pages after the cursor are the rows up to its date without those
+        of the same date up to its id: one range of the index, read in
+        its order. The same condition written as (date < d OR date = d
+        AND id < pk) is planned as two index searches and a sort of
+        everything that precedes the cursor.
+        """
+        field, tiebreak = self.field, self.tiebreak
+        cursor = decode_cursor(token)
+        if cursor is None:
+            return (self.object_list.order_by(f'-{field}', f'-{tiebreak}'),
+                    None, False)
+        direction, date, pk = cursor
+        if direction == NEXT:
+            queryset = self.object_list.filter(
+                Q(**{f'{field}__lte': date})
+                & ~Q(**{field: date, f'{tiebreak}__gte': pk})
+            ).order_by(f'-{field}', f'-{tiebreak}')
+            return queryset, token, True
+        queryset = self.object_list.filter(
+            Q(**{f'{field}__gte': date})
+            & ~Q(**{field: date, f'{tiebreak}__lte': pk})
+        ).order_by(field, tiebreak)
+        return queryset, token, True, True
+
+    def _page(self, posts, token, came_from_other, backwards=False):
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if backwards:
+            posts.reverse()
+            return CursorPage(posts, token, came_from_other, has_more,
+                              self.field)
+        return CursorPage(posts, token, has_more, came_from_other,
+                          self.field)
@@ -0,0 +1,162 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from core.highlight import MARK_END, MARK_START
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_BATCH_SIZE = 1000
+
+QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r'\w+')
+
+
+def parse_query(query):
+    """Split a raw search string into terms. Text in double quotes becomes
+    a phrase, a bare word ending with '*' becomes a prefix term. Returns
+    a list of (words, is_prefix) tuples, where words is a tuple of the
+    word characters found in the term.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN_RE.findall(query or ''):
+        words = tuple(WORD_RE.findall(phrase or word))
+        if words:
+            terms.append((words, bool(word) and word.endswith('*')))
+    return terms
+
+
+class BaseSearchBackend:
+    """Interface of a search backend. The backend keeps its own index of
+    post texts and turns a user query into a filtered and ranked Post
+    QuerySet.
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def index_many(self, posts):
+        for post in posts:
+            self.index(post)
+
+    def rebuild(self, queryset, batch_size=SEARCH_BATCH_SIZE):
+        pass
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Index-free fallback for databases without a full-text engine.
+    Every term has to be found in the post text, results are ordered
+    by publication date.
+    """
+
+    def search(self, queryset, query):
+        terms = parse_query(query)
+        if not terms:
+            return queryset.none()
+        for words, _ in terms:
+            queryset = queryset.filter(text__icontains=' '.join(words))
+        return queryset
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 backend. Post texts are kept in the posts_post_fts
+    virtual table under the rowid equal to the post id, matches are
+    ordered by bm25 relevance. The text with the matched tokens wrapped
+    in highlight markers is selected as search_marked.
+    """
+
+    def build_match(self, query):
+        parts = []
+        for words, is_prefix in parse_query(query):
+            part = '"{}"'.format(' '.join(words))
+            parts.append(part + '*' if is_prefix else part)
+        return ' '.join(parts)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = posts_post.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+            select={
+                'search_rank': f'bm25({FTS_TABLE})',
+                'search_marked': f'highlight({FTS_TABLE}, 0, %s, %s)',
+            },
+            select_params=[MARK_START, MARK_END],
+            order_by=['search_rank', '-pub_date'],
+        )
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def index_many(self, posts):
+        rows = [(post.pk, post.text) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows])
+            self._insert(cursor, rows)
+
+    def rebuild(self, queryset, batch_size=SEARCH_BATCH_SIZE):
+        rows = queryset.order_by().values_list('id', 'text')
+        batch = []
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    total += self._insert(cursor, batch)
+                    batch = []
+            total += self._insert(cursor, batch)
+        return total
+
+    def _insert(self, cursor, rows):
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)', rows)
+        return len(rows)
+
+
+@lru_cache(maxsize=None)
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    """Return the backend named in the POSTS_SEARCH_BACKEND setting.
+    Without the setting FTS5 is used on SQLite and the simple backend
+    on any other database.
+    """
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path is None:
+        if connection.vendor == 'sqlite':
+            path = 'posts.search.SQLiteFTSBackend'
+        else:
+            path = 'posts.search.SimpleSearchBackend'
+    return load_backend(path)
+
+
+def search_posts(queryset, query):
+    return get_search_backend().search(queryset, query)
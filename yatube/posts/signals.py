@@ -0,0 +1,162 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .conditional import ALL_PAGES, expire_post_pages, touch_version
+from .counters import change_author_counter, change_comments_counter
+from .fragments import bump_version
+from .groupfeed import forget_group, post_added, post_moved, post_removed
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .tasks import (catch_up_timelines, fan_out, sync_timeline,
+                    update_search_index)
+from .timeline import left_popular
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    update_search_index.enqueue(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    update_search_index.enqueue(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        change_author_counter(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follower(sender, instance, created, **kwargs):
+    if created:
+        change_author_counter(instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_lost_follower(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'followers_count', -1)
+    if left_popular(instance.author_id):
+        catch_up_timelines.enqueue(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        change_comments_counter(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_counter(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def push_post_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        fan_out.enqueue(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        sync_timeline.enqueue(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_timeline(sender, instance, **kwargs):
+    sync_timeline.enqueue(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def expire_post_fragments(sender, instance, **kwargs):
+    bump_version('post', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def expire_group_fragments(sender, instance, **kwargs):
+    bump_version('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def expire_user_fragments(sender, instance, **kwargs):
+    bump_version('user', instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    # The page of the old group has to expire when a post is moved.
+    instance.previous_group_id = instance.previous_group_slug = None
+    if instance.pk is not None:
+        instance.previous_group_id, instance.previous_group_slug = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'group__slug').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def update_group_feeds(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, 'previous_group_id', None)
+    if created:
+        post_added(instance)
+    elif previous_group_id != instance.group_id:
+        post_moved(instance, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_group_feed(sender, instance, **kwargs):
+    post_removed(instance)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance.previous_slug = None
+    if instance.pk is not None:
+        instance.previous_slug = Group.objects.filter(
+            pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    forget_group(instance.slug, getattr(instance, 'previous_slug', None))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def expire_pages_of_post(sender, instance, **kwargs):
+    expire_post_pages(
+        instance, getattr(instance, 'previous_group_slug', None))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def expire_comment_pages(sender, instance, **kwargs):
+    touch_version('post_page', instance.post_id)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def expire_follow_pages(sender, instance, **kwargs):
+    touch_version('profile_page', instance.author.username)
+
+
+@receiver([post_save, post_delete], sender=Group)
+def expire_group_pages(sender, instance, **kwargs):
+    touch_version(*ALL_PAGES)
+
+
+@receiver([post_save, post_delete], sender=User)
+def expire_user_pages(sender, instance, update_fields=None, **kwargs):
+    # Logging in only updates last_login, which no page shows.
+    if update_fields != frozenset(['last_login']):
+        touch_version(*ALL_PAGES)
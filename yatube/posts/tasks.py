@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+
+from core.tasks import task
+
+from .models import Follow, Post
+from .search import get_search_backend
+# Defined next to make_thumbnail(), imported for the worker.
+from .thumbnails import render_thumbnail  # noqa: F401
+from .timeline import (backfill_timeline, fan_out_author, fan_out_post,
+                       prune_timeline)
+
+User = get_user_model()
+
+
+@task
+def update_search_index(post_id):
+    """Index the post as it is now, or remove it from the index when it
+    is gone.
+    """
+    post = Post.objects.filter(pk=post_id).only('id', 'text').first()
+    if post is None:
+        get_search_backend().remove(post_id)
+    else:
+        get_search_backend().index(post)
+
+
+@task
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).select_related('author').first()
+    if post is not None:
+        fan_out_post(post)
+
+
+@task
+def catch_up_timelines(author_id):
+    fan_out_author(author_id)
+
+
+@task
+def sync_timeline(user_id, author_id):
+    """Fill or clean the timeline of the user by whether they follow the
+    author now, so that a follow and an unfollow may run in any order.
+    """
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        backfill_timeline(User(pk=user_id), User(pk=author_id))
+    else:
+        prune_timeline(user_id, author_id)
@@ -0,0 +1,43 @@
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from core.db.replicas import replica_stamp
+from core.perf import record_cache
+
+from ..fragments import article_keys, fragment_timeout
+
+register = template.Library()
+
+ARTICLE_TEMPLATE = 'posts/includes/article.html'
+
+
+@register.simple_tag(takes_context=True)
+def post_articles(context, posts):
+    """Return list of (post, rendered article) pairs. Articles are fetched
+    from the cache with a single get_many, only the missing ones are
+    rendered. The article depends on the page it is shown on, so the url
+    name and the group page flag are part of the key, as is the replica
+    the posts were read from.
+    """
+    posts = list(posts)
+    request = context.get('request')
+    url_name = request.resolver_match.url_name if request else ''
+    variant = (f'{url_name}:{int(bool(context.get("group")))}:'
+               f'{replica_stamp()}')
+    keys = article_keys(posts, variant)
+    cached = cache.get_many(keys.values())
+    article = context.template.engine.get_template(ARTICLE_TEMPLATE)
+    rendered = {}
+    articles = []
+    for post in posts:
+        html = cached.get(keys[post.pk])
+        if html is None:
+            with context.push(post=post):
+                html = article.render(context)
+            rendered[keys[post.pk]] = html
+        articles.append((post, mark_safe(html)))
+    record_cache(len(posts) - len(rendered), len(rendered))
+    if rendered:
+        cache.set_many(rendered, fragment_timeout())
+    return articles
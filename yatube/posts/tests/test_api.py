@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class PostsApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        for num in range(25):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост номер {num}')
+        cls.post = Post.objects.create(author=cls.reader, text='Про кошек')
+        for num in range(3):
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {num}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.auth_reader = Client()
+        self.auth_reader.force_login(self.reader)
+
+    def get(self, name, client=None, status=200, **params):
+        kwargs = params.pop('kwargs', {})
+        response = (client or self.client).get(
+            reverse(f'api:{name}', kwargs=kwargs), params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def walk(self, name, **params):
+        """Texts of all posts reached by following the next cursors."""
+        texts = []
+        cursor = ''
+        while cursor is not None:
+            data = self.get(name, cursor=cursor, **params)
+            texts += [post['text'] for post in data['results']]
+            cursor = data['next']
+        return texts
+
+    def test_index_cursor_pagination(self):
+        """Лента отдается страницами по курсору без пропусков и
+        повторов.
+        """
+        texts = self.walk('index', limit=10)
+        self.assertEqual(len(texts), 26)
+        self.assertEqual(len(set(texts)), 26)
+        self.assertEqual(texts[0], 'Про кошек')
+        second = self.get('index', limit=10)['next']
+        previous = self.get('index', limit=10, cursor=second)['previous']
+        self.assertEqual(
+            self.get('index', limit=10, cursor=previous)['results'],
+            self.get('index', limit=10)['results'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только указанные поля и не загружает
+        остальные.
+        """
+        with self.assertMaxQueries(1):
+            data = self.get('index', fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertEqual(self.get('index', fields='nope', status=400),
+                         {'error': 'Unknown fields: nope'})
+
+    def test_sparse_fields_select_columns(self):
+        """Ненужные колонки и связанные таблицы не попадают в запрос."""
+        with self.assertMaxQueries(1) as context:
+            self.get('index', fields='text')
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('image', sql)
+
+    def test_group_and_profile(self):
+        """Лента группы и автора содержит их описание и их посты."""
+        data = self.get('group_list', kwargs={'slug': 'group'})
+        self.assertEqual(data['group']['slug'], 'group')
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual({post['group'] for post in data['results']},
+                         {'group'})
+        data = self.get('profile', kwargs={'username': 'reader'})
+        self.assertEqual(data['author']['posts_count'], 1)
+        self.assertEqual(data['results'][0]['author'], 'reader')
+        self.assertIsNone(data['results'][0]['group'])
+
+    def test_post_and_comments(self):
+        """Пост отдается с числом комментариев, комментарии — по
+        курсору.
+        """
+        data = self.get('post_detail', kwargs={'post_id': self.post.pk})
+        self.assertEqual(data['comments_count'], 3)
+        data = self.get('post_comments', kwargs={'post_id': self.post.pk},
+                        limit=2)
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий 2', 'Комментарий 1'])
+        data = self.get('post_comments', kwargs={'post_id': self.post.pk},
+                        limit=2, cursor=data['next'])
+        self.assertEqual([comment['text'] for comment in data['results']],
+                         ['Комментарий 0'])
+        self.get('post_comments', kwargs={'post_id': 0}, status=404)
+
+    def test_search(self):
+        """Поиск отдает найденные посты."""
+        data = self.get('search', q='кошек')
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.post.pk])
+
+    def test_follow(self):
+        """Лента и подписки доступны только вошедшему пользователю."""
+        self.get('follow_index', status=401)
+        data = self.get('follow_index', client=self.auth_reader)
+        self.assertEqual(len(data['results']), 20)
+        data = self.get('follows', client=self.auth_reader)
+        self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_groups(self):
+        """Список групп отдается целиком."""
+        data = self.get('groups', fields='slug')
+        self.assertEqual(data['results'], [{'slug': 'group'}])
+
+    def test_read_only(self):
+        """API только читает данные."""
+        response = self.auth_reader.post(reverse('api:index'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_not_modified(self):
+        """Неизмененная лента отдается ответом 304."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
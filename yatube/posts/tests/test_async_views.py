@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from django.urls import reverse
+
+from .. import async_views, views
+from ..models import Comment, Follow, Group, Post
+from ..views import NUM_POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class AsyncViewsTests(TestCase):
+    """Под ASGI страницы для чтения отдаются асинхронными
+    представлениями через асинхронную цепочку middleware.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Группа автора')
+        Post.objects.bulk_create([
+            Post(author=cls.author, group=cls.group, text=f'Пост {num}')
+            for num in range(NUM_POSTS_PER_PAGE + 2)])
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Последний пост')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_asgi_routes(self):
+        """Запрос через ASGI попадает в асинхронное представление."""
+        response = await self.async_client.get(reverse('posts:index'))
+        self.assertIs(response.resolver_match.func, async_views.index)
+        response = await self.async_client.get(reverse('about:author'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_wsgi_routes(self):
+        """Запрос через WSGI попадает в синхронное представление."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertIs(response.resolver_match.func, views.index)
+
+    async def test_pages(self):
+        """Страницы открываются и получают нужный контекст."""
+        client = AsyncClient()
+        await client.aforce_login(self.reader)
+        pages = {
+            reverse('posts:index'): 'posts/index.html',
+            reverse('posts:group_list', kwargs={'slug': 'group'}):
+                'posts/group_list.html',
+            reverse('posts:profile', kwargs={'username': 'author'}):
+                'posts/profile.html',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}):
+                'posts/post_detail.html',
+            reverse('posts:search') + '?q=пост': 'posts/search.html',
+        }
+        for address, template in pages.items():
+            with self.subTest(address=address):
+                response = await client.get(address)
+                self.assertTemplateUsed(response, template)
+        response = await client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['page_obj'][0], self.post)
+        response = await client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual([comment.text for comment in response.context[
+            'comments']], ['Комментарий'])
+
+    async def test_page_numbers(self):
+        """Номер страницы вне списка ведет на последнюю страницу, как
+        у синхронного пагинатора.
+        """
+        for page in ('2', '99', '-1', 'abc'):
+            with self.subTest(page=page):
+                response = await self.async_client.get(
+                    reverse('posts:index'), {'page': page})
+                page_obj = response.context['page_obj']
+                self.assertEqual(page_obj.paginator.count,
+                                 NUM_POSTS_PER_PAGE + 3)
+                expected = 1 if page == 'abc' else 2
+                self.assertEqual(page_obj.number, expected)
+                self.assertEqual(len(page_obj),
+                                 NUM_POSTS_PER_PAGE if expected == 1 else 3)
+
+    async def test_missing_pages(self):
+        """Несуществующие автор и пост дают 404."""
+        for address in (
+                reverse('posts:profile', kwargs={'username': 'nobody'}),
+                reverse('posts:post_detail', kwargs={'post_id': 0})):
+            with self.subTest(address=address):
+                response = await self.async_client.get(address)
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..benchmark import VIEWS, percentile
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry)
+from ..search import search_posts
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ExplainFeedsCommandTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют
+        результат во временном B-дереве.
+        """
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertNotIn('FAIL', out.getvalue())
+
+
+class BenchmarkCommandsTests(TestCase):
+    def test_seed_and_benchmark(self):
+        """Синтетические данные заполняют счетчики и ленты, а замер
+        выдает JSON со статистикой по каждой странице.
+        """
+        call_command('seed_data', users=10, groups=3, posts=60, comments=40,
+                     follows=3, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Follow.objects.count(), 30)
+        self.assertEqual(
+            AuthorStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            60)
+        self.assertTrue(TimelineEntry.objects.exists())
+        out = StringIO()
+        call_command('benchmark', requests=4, warmup=1, login=True,
+                     stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['views']), set(VIEWS))
+        for name, result in report['views'].items():
+            with self.subTest(view=name):
+                self.assertEqual(result['status'], [200])
+                self.assertEqual(result['requests'], 4)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertGreater(result['queries_per_request'], 0)
+
+    def test_seed_expires_pages(self):
+        """После заполнения данных закэшированные страницы не отдаются
+        как неизмененные.
+        """
+        cache.clear()
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        call_command('seed_data', users=3, groups=1, posts=5, comments=0,
+                     follows=1, stdout=StringIO())
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_mixed_benchmark(self):
+        """Смешанная нагрузка отправляет комментарии и подписки вместе
+        с чтением страниц.
+        """
+        call_command('seed_data', users=5, groups=2, posts=20, comments=10,
+                     follows=2, stdout=StringIO())
+        comments = Comment.objects.count()
+        out = StringIO()
+        call_command('benchmark', views=['index', 'profile'], requests=20,
+                     warmup=0, mixed=0.5, stdout=out, stderr=StringIO())
+        result = json.loads(out.getvalue())['mixed_load']
+        self.assertEqual(result['requests'], 20)
+        self.assertGreater(result['writes'], 0)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(Comment.objects.count(), comments)
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferCommandsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек')
+        self.pub_date = datetime(2020, 5, 17, 12, 30, tzinfo=timezone.utc)
+        post = Post.objects.create(
+            author=author, group=group, text='Кошки любят спать',
+            image=SimpleUploadedFile('cat.gif', b'GIF89a',
+                                     content_type='image/gif'))
+        Post.objects.filter(pk=post.pk).update(pub_date=self.pub_date)
+        Post.objects.create(author=reader, text='Пост читателя')
+        Comment.objects.create(post=post, author=reader, text='Согласен')
+        Follow.objects.create(user=reader, author=author)
+        self.image = post.image.name
+
+    def clear(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, self.image))
+
+    def test_export_and_import(self):
+        """Экспорт и импорт переносят записи, даты и картинки, а счетчики,
+        ленты и поиск заполняются заново.
+        """
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(format=fmt):
+                path = os.path.join(self.export_dir, f'dump.{fmt}')
+                media_dir = os.path.join(self.export_dir, fmt)
+                call_command('export_posts', path, media_dir=media_dir,
+                             chunk_size=1, stdout=StringIO())
+                self.clear()
+                call_command('import_posts', path, media_dir=media_dir,
+                             batch_size=1, stdout=StringIO())
+                self.assertEqual(User.objects.count(), 2)
+                post = Post.objects.get(group__slug='cats')
+                self.assertEqual(post.pub_date, self.pub_date)
+                self.assertEqual(post.author.username, 'author')
+                self.assertEqual(post.comments_count, 1)
+                self.assertTrue(os.path.exists(post.image.path))
+                self.assertEqual(post.author.stats.posts_count, 1)
+                self.assertEqual(post.author.stats.followers_count, 1)
+                self.assertTrue(TimelineEntry.objects.filter(
+                    user__username='reader', post=post).exists())
+                self.assertEqual(
+                    [*search_posts(Post.objects.all(), 'кошки')], [post])
+
+    def test_import_skips_unknown_references(self):
+        """Записи со ссылками на отсутствующих авторов и посты
+        пропускаются.
+        """
+        path = os.path.join(self.export_dir, 'dump.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(
+                {'type': 'post', 'id': 1, 'author': 'nobody', 'text': 'x'}))
+            file.write('\n')
+            file.write(json.dumps(
+                {'type': 'comment', 'post': 1, 'author': 'reader',
+                 'text': 'x'}))
+        out = StringIO()
+        call_command('import_posts', path, stdout=out)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertIn('skipped: 2', out.getvalue())
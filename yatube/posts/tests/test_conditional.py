@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.auth_reader = Client()
+        self.auth_reader.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', kwargs={'slug': 'group'}),
+            'other': reverse('posts:group_list', kwargs={'slug': 'other'}),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': 'author'}),
+            'post': reverse('posts:post_detail',
+                            kwargs={'post_id': self.post.pk}),
+        }
+
+    def etags(self, client):
+        etags = {}
+        for name, url in self.urls.items():
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.has_header('Last-Modified'))
+            etags[name] = response['ETag']
+        return etags
+
+    def changed(self, client, etags):
+        return {name for name, url in self.urls.items()
+                if client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                .status_code != 304}
+
+    def test_not_modified_without_queries(self):
+        """Неизмененная страница отдается ответом 304 без запросов к
+        базе.
+        """
+        etags = self.etags(self.client)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.urls['index'], HTTP_IF_NONE_MATCH=etags['index'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.changed(self.client, etags), set())
+
+    def test_etag_depends_on_user(self):
+        """Страницы разных пользователей не совпадают."""
+        anonymous = self.etags(self.client)
+        self.assertEqual(self.changed(self.auth_reader, anonymous),
+                         set(self.urls))
+
+    def test_writes_expire_pages(self):
+        """Изменения постов, комментариев и подписок меняют версии только
+        затронутых страниц.
+        """
+        etags = self.etags(self.auth_reader)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        self.assertEqual(self.changed(self.auth_reader, etags), {'post'})
+
+        etags = self.etags(self.auth_reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.changed(self.auth_reader, etags),
+                         {'profile', 'post'})
+
+        etags = self.etags(self.auth_reader)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.changed(self.auth_reader, etags),
+                         set(self.urls))
+
+        etags = self.etags(self.auth_reader)
+        self.other_group.title = 'Новое название'
+        self.other_group.save()
+        self.assertEqual(self.changed(self.auth_reader, etags),
+                         set(self.urls))
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.auth_reader = Client()
+        cls.auth_reader.force_login(cls.reader)
+
+    def stats(self):
+        return AuthorStats.objects.get(user=self.author_user)
+
+    def test_counters_follow_changes(self):
+        """Счетчики постов, подписчиков и комментариев обновляются."""
+        post = Post.objects.create(
+            author=self.author_user, text='Пост, который посчитают')
+        Follow.objects.create(user=self.reader, author=self.author_user)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        self.assertEqual(self.stats().posts_count, 1)
+        self.assertEqual(self.stats().followers_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats().followers_count, 0)
+        post.delete()
+        self.assertEqual(self.stats().posts_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет рассинхронизацию счетчиков."""
+        Post.objects.bulk_create([
+            Post(author=self.author_user, text=f'Пост {num}')
+            for num in range(3)
+        ])
+        AuthorStats.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.stats().posts_count, 0)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.stats().posts_count, 3)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
+
+    def test_pages_without_aggregates(self):
+        """Профиль и страница поста не выполняют COUNT-запросов."""
+        post = Post.objects.create(
+            author=self.author_user, text='Пост без агрегатов')
+        addresses = {
+            reverse('posts:profile',
+                    kwargs={'username': self.author_user}): 5,
+            reverse('posts:post_detail', kwargs={'post_id': post.id}): 5,
+        }
+        for address, num_queries in addresses.items():
+            with self.subTest(address=address):
+                with self.assertNumQueries(num_queries) as queries:
+                    response = self.auth_reader.get(address)
+                self.assertEqual(response.status_code, 200)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def test_author_without_stats(self):
+        """Страницы автора без строки статистики открываются, а счетчики
+        считаются заново.
+        """
+        User.objects.bulk_create([User(username='imported')])
+        author = User.objects.get(username='imported')
+        post = Post.objects.bulk_create(
+            [Post(author=author, text='Импортированный пост')])[0]
+        self.assertFalse(AuthorStats.objects.filter(user=author).exists())
+        for address in (reverse('posts:profile', args=['imported']),
+                        reverse('api:profile', args=['imported']),
+                        reverse('posts:post_detail', args=[post.pk])):
+            with self.subTest(address=address):
+                self.assertEqual(
+                    self.auth_reader.get(address).status_code, 200)
+        self.assertEqual(AuthorStats.objects.get(
+            user=author).posts_count, 1)
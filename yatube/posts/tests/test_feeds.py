@@ -0,0 +1,126 @@
+import json
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedsTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {num}')
+            for num in range(12))
+        cls.other_post = Post.objects.create(
+            author=cls.other, text='Пост <без> группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def rss_items(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/rss+xml'))
+        channel = ElementTree.fromstring(response.content).find('channel')
+        return [item.findtext('title') for item in channel.iter('item')]
+
+    def test_site_feed(self):
+        """Лента сайта содержит новые посты всех авторов."""
+        titles = self.rss_items(reverse('posts:index_rss'))
+        self.assertEqual(len(titles), 13)
+        self.assertEqual(titles[0], 'Пост <без> группы')
+
+    @override_settings(POSTS_FEED_SIZE=5)
+    def test_feed_size(self):
+        """В ленте не больше POSTS_FEED_SIZE постов."""
+        self.assertEqual(len(self.rss_items(reverse('posts:index_rss'))), 5)
+
+    def test_group_and_profile_feeds(self):
+        """Ленты группы и автора содержат только их посты."""
+        for url in (
+            reverse('posts:group_rss', kwargs={'slug': 'group'}),
+            reverse('posts:profile_rss', kwargs={'username': 'author'}),
+        ):
+            with self.subTest(url=url):
+                titles = self.rss_items(url)
+                self.assertEqual(len(titles), 12)
+                self.assertNotIn('Пост <без> группы', titles)
+
+    def test_atom_feed(self):
+        """Atom-лента автора подписана его именем."""
+        response = self.client.get(
+            reverse('posts:profile_atom', kwargs={'username': 'author'}))
+        feed = ElementTree.fromstring(response.content)
+        self.assertEqual(feed.findtext(f'{ATOM}title'), 'Yatube: Лев Толстой')
+        self.assertEqual(len(feed.findall(f'{ATOM}entry')), 12)
+
+    def test_missing_feed_object(self):
+        """Лента несуществующей группы или автора отдает 404."""
+        for url in (
+            reverse('posts:group_atom', kwargs={'slug': 'missing'}),
+            reverse('posts:profile_rss', kwargs={'username': 'missing'}),
+            reverse('posts:profile_export', kwargs={'username': 'missing'}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_feed_queries(self):
+        """Лента собирается одним запросом к постам."""
+        url = reverse('posts:group_rss', kwargs={'slug': 'group'})
+        with self.assertMaxQueries(2):
+            self.client.get(url)
+
+    def test_not_modified(self):
+        """Неизмененная лента и выгрузка отдаются ответом 304, новый пост
+        автора меняет их.
+        """
+        urls = [
+            reverse('posts:profile_rss', kwargs={'username': 'author'}),
+            reverse('posts:profile_export', kwargs={'username': 'author'}),
+        ]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    @mock.patch('posts.views.EXPORT_CHUNK_SIZE', 5)
+    def test_profile_export(self):
+        """Выгрузка отдает все посты автора одним JSON-документом по
+        частям.
+        """
+        response = self.client.get(
+            reverse('posts:profile_export', kwargs={'username': 'author'}))
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 5)
+        data = json.loads(b''.join(chunks))
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(len(data['posts']), 12)
+        self.assertEqual(
+            set(data['posts'][0]),
+            {'id', 'text', 'pub_date', 'group', 'image'})
+        self.assertEqual(data['posts'][0]['group'], 'group')
@@ -70,7 +70,7 @@ class PostsFormsTests(TestCase):
     def test_edit_post(self):
         """Валидная форма редактирует запись в Post."""
         form_data = {
-            'text': 'После правки текст такой.',
+            'text': 'После правки текст поста стал вот таким.',
         }
         response = self.auth_author.post(
             reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
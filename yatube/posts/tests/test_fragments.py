@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class ArticleFragmentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Якобы такая группа',
+            slug='test-slug',
+            description='Группа с непонятной целью и содержанием',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author_user,
+            group=cls.group,
+            text='Пост, статья которого попадет в кэш',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_variants_per_page(self):
+        """Статья кэшируется отдельно для разных страниц."""
+        index = self.client.get(reverse('posts:index'))
+        profile = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.author_user}))
+        group = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}))
+        self.assertContains(index, 'Лев Толстой')
+        self.assertContains(index, self.group.title)
+        self.assertNotContains(profile, '<b>Автор:</b>')
+        self.assertNotContains(group, '<b>Группа:</b>')
+
+    def test_related_changes_expire_article(self):
+        """Правка группы или автора обновляет закэшированную статью."""
+        self.client.get(reverse('posts:index'))
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Переименованная группа'
+        group.save()
+        author = User.objects.get(pk=self.author_user.pk)
+        author.first_name = 'Алексей'
+        author.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Переименованная группа')
+        self.assertContains(response, 'Алексей Толстой')
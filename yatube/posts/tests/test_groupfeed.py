@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.db.replicas import Reads, request_reads
+
+from ..groupfeed import feed_key, get_group, get_group_feed
+from ..models import Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+NUM_POSTS = 10
+
+
+class GroupFeedTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {num}')
+            for num in range(NUM_POSTS)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def newest_ids(self, group):
+        return list(group.posts.order_by('-pub_date', '-id').values_list(
+            'id', flat=True))
+
+    def test_group_pages(self):
+        """Страницы группы из кэша совпадают с запросом к базе, а теплая
+        страница читается одним запросом постов.
+        """
+        address = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(address)
+        for page, ids in ((1, self.newest_ids(self.group)[:7]),
+                          (2, self.newest_ids(self.group)[7:])):
+            with self.subTest(page=page):
+                # Сессия, пользователь и посты страницы.
+                with self.assertMaxQueries(3):
+                    response = self.client.get(address, {'page': page})
+                page_obj = response.context['page_obj']
+                self.assertEqual([post.pk for post in page_obj], ids)
+                self.assertEqual(page_obj.paginator.count, NUM_POSTS)
+
+    def test_pages_beyond_cached_ids(self):
+        """Страницы дальше закэшированных постов читаются из базы."""
+        address = reverse('posts:group_list', args=[self.group.slug])
+        with self.settings(POSTS_GROUP_FEED_SIZE=5):
+            response = self.client.get(address, {'page': 2})
+        self.assertEqual([post.pk for post in response.context['page_obj']],
+                         self.newest_ids(self.group)[7:])
+
+    def test_new_post_prepended(self):
+        """Новый пост добавляется в начало закэшированного списка."""
+        get_group_feed(self.group)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=self.author, group=self.group,
+                                       text='Новый пост')
+        with self.assertNumQueries(0):
+            feed = get_group_feed(self.group)
+        self.assertEqual(feed.ids, self.newest_ids(self.group))
+        self.assertEqual(feed.ids[0], post.pk)
+        self.assertEqual(feed.count, NUM_POSTS + 1)
+
+    def test_deleted_post_removed(self):
+        """Удаленный пост убирается из закэшированного списка."""
+        get_group_feed(self.group)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[-1].delete()
+        with self.assertNumQueries(0):
+            feed = get_group_feed(self.group)
+        self.assertEqual(feed.ids, self.newest_ids(self.group))
+        self.assertEqual(feed.count, NUM_POSTS - 1)
+
+    def test_moved_post(self):
+        """Пост, перенесенный в другую группу, пропадает из старой и
+        появляется в новой.
+        """
+        get_group_feed(self.group)
+        get_group_feed(self.other)
+        post = self.posts[3]
+        post.group = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        with self.assertNumQueries(0):
+            feed = get_group_feed(self.group)
+        self.assertNotIn(post.pk, feed.ids)
+        self.assertEqual(feed.count, NUM_POSTS - 1)
+        self.assertEqual(get_group_feed(self.other), ([post.pk], 1))
+
+    def test_feed_read_before_change(self):
+        """Список, прочитанный из базы между коммитом и обновлением кэша,
+        не учитывает новый пост дважды, а прочитанный до коммита не
+        используется.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = Post.objects.create(author=self.author, group=self.group,
+                                       text='Новый пост')
+        get_group_feed(self.group)
+        for callback in callbacks:
+            callback()
+        feed = get_group_feed(self.group)
+        self.assertEqual(feed.ids[0], post.pk)
+        self.assertEqual(feed.count, NUM_POSTS + 1)
+        stale = cache.get(feed_key(self.group.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].delete()
+        cache.set(feed_key(self.group.pk), stale)
+        self.assertEqual(get_group_feed(self.group).count, NUM_POSTS)
+
+    def test_group_lookup_cached(self):
+        """Группа по slug берется из кэша, а после смены slug старый
+        адрес больше не находит ее.
+        """
+        get_group(self.group.slug)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group(self.group.slug), self.group)
+        self.group.slug = 'renamed'
+        self.group.save()
+        with self.assertRaises(Http404):
+            get_group('group')
+        self.assertEqual(get_group('renamed').pk, self.group.pk)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_read_from_primary(self):
+        """Группа и лента, которые кэшируются для читателей всех реплик,
+        читаются из основной базы даже при чтении с реплики.
+        """
+        token = request_reads.set(Reads('replica1'))
+        try:
+            group = get_group(self.group.slug)
+            feed = get_group_feed(group)
+        finally:
+            request_reads.reset(token)
+        self.assertEqual(feed.ids, self.newest_ids(self.group))
+        self.assertEqual(feed.count, NUM_POSTS)
+
+    def test_warm_command(self):
+        """Команда заранее кэширует группы с наибольшим числом постов."""
+        out = StringIO()
+        call_command('warm_group_feeds', limit=1, stdout=out)
+        self.assertIn('1', out.getvalue())
+        with self.assertNumQueries(0):
+            get_group(self.group.slug)
+            get_group_feed(self.group)
@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..pagination import (NEXT, PREVIOUS, CursorPaginator, decode_cursor,
+                          encode_cursor)
+from ..timeline import timeline_posts
+
+User = get_user_model()
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Якобы такая группа',
+            slug='test-slug',
+            description='Группа с непонятной целью и содержанием',
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author_user,
+                 group=cls.group,
+                 text=f'{num}) Пост за все хорошее и против плохого')
+            for num in range(17)
+        ])
+        cls.posts = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, address):
+        """Пройти ленту вперед по ссылкам next_cursor."""
+        pages = []
+        response = self.client.get(address)
+        while True:
+            page_obj = response.context.get('page_obj')
+            pages.append(page_obj)
+            if not page_obj.next_cursor:
+                return pages
+            response = self.client.get(
+                address, {'cursor': page_obj.next_cursor})
+
+    def test_feeds_walk_forward(self):
+        """Курсорная пагинация выводит все посты ленты без повторов."""
+        feed_addresses = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author_user}),
+        ]
+        for address in feed_addresses:
+            with self.subTest(address=address):
+                pages = self.walk(address)
+                self.assertEqual([len(page) for page in pages], [7, 7, 3])
+                self.assertEqual(
+                    [post for page in pages for post in page], self.posts)
+                self.assertFalse(pages[0].has_previous())
+                self.assertTrue(pages[-1].has_previous())
+
+    def test_walk_backward(self):
+        """Ссылка на предыдущую страницу возвращает ту же выборку."""
+        paginator = CursorPaginator(Post.objects.all(), 7)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_next())
+        first_again = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(first_again), list(first))
+        self.assertFalse(first_again.has_previous())
+
+    def test_single_query_without_count(self):
+        """Страница выбирается одним запросом без COUNT и OFFSET."""
+        paginator = CursorPaginator(Post.objects.all(), 7)
+        token = paginator.get_page(None).next_cursor
+        with self.assertNumQueries(1) as queries:
+            list(paginator.get_page(token))
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('COUNT', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_broken_cursor(self):
+        """Испорченный курсор открывает первую страницу."""
+        self.assertIsNone(decode_cursor('не-курсор'))
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'bWVo'})
+        self.assertEqual(
+            list(response.context.get('page_obj')), self.posts[:7])
+
+    def test_same_date(self):
+        """Посты с одинаковой датой публикации не теряются и не
+        повторяются ни при движении вперед, ни назад.
+        """
+        Post.objects.update(pub_date=self.posts[0].pub_date)
+        posts = list(Post.objects.order_by('-pub_date', '-id'))
+        paginator = CursorPaginator(Post.objects.all(), 7)
+        pages = [paginator.get_page(None)]
+        while pages[-1].next_cursor:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([post for page in pages for post in page], posts)
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+    def test_follow_feed(self):
+        """Лента подписок листается по дате и посту записи ленты."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author_user)
+        self.client.force_login(reader)
+        pages = self.walk(reverse('posts:follow_index'))
+        self.assertEqual([post for page in pages for post in page],
+                         self.posts)
+
+    def test_index_order(self):
+        """Страницы курсорной пагинации читаются в порядке индекса, без
+        сортировки во временном B-дереве.
+        """
+        reader = User.objects.create_user(username='reader')
+        feeds = {
+            'index': (Post.objects.all(), 'pub_date', 'id'),
+            'group': (Post.objects.filter(group=self.group),
+                      'pub_date', 'id'),
+            'profile': (Post.objects.filter(author=self.author_user),
+                        'pub_date', 'id'),
+            'follow': (timeline_posts(reader),
+                       'timeline_date', 'timeline_post'),
+            'comments': (Comment.objects.filter(post=self.posts[0]),
+                         'created', 'id'),
+        }
+        post = self.posts[3]
+        self.analyze_as_large()
+        for name, (queryset, field, tiebreak) in feeds.items():
+            paginator = CursorPaginator(queryset, 7, field, tiebreak)
+            for token in (None, encode_cursor(post, NEXT),
+                          encode_cursor(post, PREVIOUS)):
+                with self.subTest(feed=name, token=token):
+                    sql, params = paginator.locate(
+                        token)[0][:8].query.sql_with_params()
+                    with connection.cursor() as cursor:
+                        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                        plan = [row[-1] for row in cursor.fetchall()]
+                    # A page after a cursor starts with a search of the
+                    # index, not with a scan from the newest post.
+                    self.assertFalse(
+                        [row for row in plan if 'TEMP B-TREE' in row
+                         or 'MULTI-INDEX OR' in row
+                         or row.startswith('SCAN') and (
+                             token or 'INDEX' not in row)], plan)
+
+    def analyze_as_large(self):
+        """Make SQLite plan the queries as for a database of 300 000
+        posts: with a handful of rows it picks the same plan for any
+        condition.
+        """
+        # Rows of the table and rows per value of the first column of
+        # its indexes.
+        tables = {
+            'posts_post': (300000, {
+                'pub_date': 3, 'group_id': 14286, 'author_id': 3000}),
+            'posts_timelineentry': (187610, {'user_id': 1877, 'post_id': 38}),
+            'posts_comment': (5551, {'post_id': 2, 'author_id': 56}),
+        }
+        stats = []
+        with connection.cursor() as cursor:
+            for table, (rows, per_value) in tables.items():
+                cursor.execute(f'PRAGMA index_list({table})')
+                for index in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute(f'PRAGMA index_info({index})')
+                    columns = [row[2] for row in cursor.fetchall()]
+                    stats.append((table, index, ' '.join(
+                        map(str, [rows, per_value.get(columns[0], 1),
+                                  *[1] * (len(columns) - 1)]))))
+            cursor.execute('ANALYZE')
+            cursor.execute('DELETE FROM sqlite_stat1')
+            cursor.executemany(
+                'INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (%s, %s, %s)',
+                stats)
+            cursor.execute('ANALYZE sqlite_schema')
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+NUM_AUTHORS = 7
+
+
+class FeedQueriesTests(QueryBudgetMixin, TestCase):
+    """Число запросов страниц не зависит от числа постов на них."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.auth_reader = Client()
+        cls.auth_reader.force_login(cls.reader)
+        cls.group = Group.objects.create(
+            title='Общая группа', slug='common', description='Общая')
+        for num in range(NUM_AUTHORS):
+            author = User.objects.create_user(username=f'author{num}')
+            group = Group.objects.create(
+                title=f'Группа {num}', slug=f'group-{num}',
+                description='Своя группа автора')
+            for post_group in (group, cls.group):
+                post = Post.objects.create(
+                    author=author, group=post_group,
+                    text=f'Пост номер {num} про все хорошее')
+                Comment.objects.create(
+                    post=post, author=cls.reader, text='Комментарий')
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.author = author
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+
+    def test_views_query_budget(self):
+        """Страницы укладываются в бюджет запросов."""
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 5,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 5,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 5,
+            reverse('posts:search') + '?q=пост': 4,
+            reverse('posts:follow_index'): 5,
+        }
+        for address, budget in budgets.items():
+            with self.subTest(address=address):
+                cache.clear()
+                with self.assertMaxQueries(budget):
+                    response = self.auth_reader.get(address)
+                self.assertEqual(response.status_code, 200)
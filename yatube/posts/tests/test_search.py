@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import get_search_backend, parse_query
+
+User = get_user_model()
+
+
+class PostsSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='author')
+        cls.post_about_cats = Post.objects.create(
+            author=cls.author_user,
+            text='Кошки любят спать на солнце. Кошки кошки кошки.',
+        )
+        cls.post_about_dogs = Post.objects.create(
+            author=cls.author_user,
+            text='Собаки любят гулять, а кошки любят спать.',
+        )
+        cls.post_about_birds = Post.objects.create(
+            author=cls.author_user,
+            text='Птицы поют по утрам и улетают на юг.',
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [*response.context.get('page_obj')]
+
+    def test_parse_query(self):
+        """Запрос разбивается на слова, фразы и префиксы."""
+        self.assertEqual(
+            parse_query('"любят спать" кош* (;'),
+            [(('любят', 'спать'), False), (('кош',), True)])
+
+    def test_search_ranks_by_relevance(self):
+        """Более релевантный пост показывается первым."""
+        self.assertEqual(
+            self.search('кошки'),
+            [self.post_about_cats, self.post_about_dogs])
+
+    def test_search_prefix_and_phrase(self):
+        """Поддерживаются префиксные и фразовые запросы."""
+        self.assertEqual(self.search('птиц*'), [self.post_about_birds])
+        self.assertEqual(self.search('"любят гулять"'),
+                         [self.post_about_dogs])
+        self.assertEqual(self.search('"гулять любят"'), [])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(
+            author=self.author_user, text='Временный пост про черепах')
+        self.assertEqual(self.search('черепах'), [post])
+        post.text = 'Временный пост про ежей'
+        post.save()
+        self.assertEqual(self.search('черепах'), [])
+        self.assertEqual(self.search('ежей'), [post])
+        post.delete()
+        self.assertEqual(self.search('ежей'), [])
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index индексирует созданные в обход
+        сигналов посты.
+        """
+        Post.objects.bulk_create([
+            Post(author=self.author_user, text=f'Массовый пост {num}')
+            for num in range(5)
+        ])
+        self.assertEqual(self.search('массовый'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn(str(Post.objects.count()), out.getvalue())
+        self.assertEqual(len(self.search('массовый')), 5)
+
+    def test_unsafe_query(self):
+        """Спецсимволы в запросе не ломают поиск."""
+        for query in ('(', '"', 'NEAR(', '*', 'a OR'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_backend_from_settings(self):
+        """Бэкенд по умолчанию зависит от СУБД."""
+        self.assertEqual(get_search_backend().__class__.__name__,
+                         'SQLiteFTSBackend')
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.tasks import get_broker
+
+from ..models import Follow, Post, TimelineEntry
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class BackgroundTasksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(self.settings(
+            TASKS_BACKGROUND=True,
+            TASKS_BROKER=os.path.join(directory, 'tasks.sqlite3')))
+
+    def run_tasks(self):
+        call_command('run_tasks', processes=0, stdout=StringIO())
+
+    def test_side_effects_run_by_worker(self):
+        """Индексация и ленты ставятся в очередь после коммита и
+        выполняются воркером.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.reader, author=self.author)
+            post = Post.objects.create(author=self.author, text='Снегопад')
+            post.text = 'Снегопад в горах'
+            post.save()
+        # Повторное сохранение поста не дублирует индексацию.
+        self.assertEqual(get_broker().counts()['waiting'], 3)
+        self.assertFalse(search_posts(Post.objects.all(), 'горах').exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.run_tasks()
+        self.assertTrue(search_posts(Post.objects.all(), 'горах').exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(get_broker().counts()['waiting'], 0)
+
+    def test_unfollow_after_follow(self):
+        """Отписка, пришедшая раньше выполнения подписки, оставляет ленту
+        пустой.
+        """
+        Post.objects.create(author=self.author, text='Пост')
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=self.reader, author=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.filter(user=self.reader).delete()
+        self.run_tasks()
+        self.assertFalse(TimelineEntry.objects.exists())
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import VARIANT_WIDTHS, render_thumbnail
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author_user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author_user,
+            text='Пост с картинкой, которой нужна миниатюра',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF,
+                content_type='image/gif'),
+        )
+
+    def test_page_uses_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюры нет, страница показывает заглушку, а не исходную
+        картинку, после генерации - сохраненный адрес миниатюры.
+        """
+        address = reverse('posts:index')
+        response = self.client.get(address)
+        self.assertContains(response, static('img/placeholder.svg'))
+        self.assertNotContains(response, self.post.image.url)
+        render_thumbnail(self.post.id)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnail)
+        self.assertContains(self.client.get(address), self.post.thumbnail)
+
+    def test_responsive_variants(self):
+        """Варианты картинки всех ширин сохраняются в манифесте и попадают
+        в srcset.
+        """
+        render_thumbnail(self.post.id)
+        post = Post.objects.get(pk=self.post.pk)
+        srcset = post.variants['image/jpeg']
+        for width in VARIANT_WIDTHS:
+            self.assertIn(f' {width}w', srcset)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, f'srcset="{srcset}"')
+
+    def test_thumbnail_queued(self):
+        """С фоновыми задачами миниатюра нового поста делается воркером."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.client.force_login(self.author_user)
+        text = 'Еще один пост с картинкой для миниатюры'
+        with self.settings(
+                TASKS_BACKGROUND=True,
+                TASKS_BROKER=os.path.join(directory, 'tasks.sqlite3')):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('posts:post_create'), {
+                    'text': text,
+                    'image': SimpleUploadedFile(
+                        name='other.gif', content=SMALL_GIF,
+                        content_type='image/gif'),
+                })
+            post = Post.objects.get(text=text)
+            self.assertFalse(post.thumbnail)
+            call_command('run_tasks', processes=0, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail)
+
+    def test_backfill_command(self):
+        """Команда generate_thumbnails заполняет отсутствующие миниатюры."""
+        call_command(
+            'generate_thumbnails', processes=0, stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnail.startswith(settings.MEDIA_URL))
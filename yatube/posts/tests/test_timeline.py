@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.auth_reader = Client()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author_user = User.objects.create_user(username='author')
+        cls.auth_reader.force_login(cls.reader)
+        cls.old_post = Post.objects.create(
+            author=cls.author_user,
+            text='Пост, написанный до подписки читателя.',
+        )
+
+    def feed(self):
+        response = self.auth_reader.get(reverse('posts:follow_index'))
+        return [*response.context.get('page_obj')]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка переносит старые посты в ленту, отписка удаляет их."""
+        self.auth_reader.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author_user}))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+        self.auth_reader.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author_user}))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост попадает в ленты подписчиков при создании."""
+        Follow.objects.create(user=self.reader, author=self.author_user)
+        post = Post.objects.create(
+            author=self.author_user, text='Свежий пост для подписчиков')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(POSTS_FANOUT_THRESHOLD=0)
+    def test_popular_author_pulled_on_read(self):
+        """Посты популярного автора не копируются, а подмешиваются
+        в ленту при чтении.
+        """
+        Follow.objects.create(user=self.reader, author=self.author_user)
+        post = Post.objects.create(
+            author=self.author_user, text='Пост очень популярного автора')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(POSTS_FANOUT_THRESHOLD=1)
+    def test_author_no_longer_popular(self):
+        """Когда автор перестает быть популярным, его посты и подписки
+        времени популярности переносятся в ленты.
+        """
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author_user)
+        Follow.objects.create(user=self.reader, author=self.author_user)
+        post = Post.objects.create(
+            author=self.author_user, text='Пост времени популярности')
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader).count(), 2)
+        self.assertEqual(self.feed(), [post, self.old_post])
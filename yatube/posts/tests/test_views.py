@@ -1,15 +1,18 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Group, Post
+from ..views import NUM_POSTS_PER_PAGE, make_pages
 
 User = get_user_model()
 
@@ -45,6 +48,7 @@ class PostsViewsTests(TestCase):
                            text=f'{num}) Пост за все хорошее и против плохого')
                           for num in range(12)]
         Post.objects.bulk_create(test_posts_set)
+        call_command('recount', stdout=StringIO())
 
         small_gif = (
             b'\x47\x49\x46\x38\x39\x61\x02\x00'
@@ -104,12 +108,24 @@ class PostsViewsTests(TestCase):
             reverse('posts:group_list', kwargs={'slug': self.group.slug}),
             reverse('posts:profile', kwargs={'username': self.author_user})
         ]
+        total = Post.objects.count()
         for paginator in paginator_addresses:
             with self.subTest(paginator=paginator):
                 response = self.client.get(paginator)
-                self.assertEqual(len(response.context['page_obj']), 10)
+                self.assertEqual(len(response.context['page_obj']),
+                                 NUM_POSTS_PER_PAGE)
                 response = self.client.get(paginator + '?page=2')
-                self.assertEqual(len(response.context['page_obj']), 3)
+                self.assertEqual(len(response.context['page_obj']),
+                                 total - NUM_POSTS_PER_PAGE)
+
+    def test_paginator_elides_distant_pages(self):
+        """Пагинатор ссылается только на страницы рядом с текущей"""
+        request = RequestFactory().get('/', {'page': 250})
+        page = make_pages(request, list(range(5000)), 10, cursor=False)
+        ellipsis = page.paginator.ELLIPSIS
+        self.assertEqual(
+            page.page_range,
+            [1, 2, ellipsis, *range(247, 254), ellipsis, 499, 500])
 
     def test_index_show_correct_context(self):
         """Проверка контекста главной страницы"""
@@ -210,21 +226,29 @@ class PostsViewsTests(TestCase):
         self.assertNotIn(self.post, [*response.context.get('page_obj')])
 
     def test_cache(self):
-        """Проверка работы функции кэширования. Удаленный пост продолжает
-        показываться и исчезает после очистки кэша.
+        """Проверка работы функции кэширования. Статьи постов берутся из кэша
+        и обновляются после очистки кэша или сохранения поста.
         """
         post = Post.objects.create(
             author=self.author_user,
             text='Специальный пост для тестирования кэша')
-        response_predelete = self.client.get(reverse('posts:index'))
-        post.delete()
-        response_afterdelete = self.client.get(reverse('posts:index'))
-        self.assertEqual(response_predelete.content,
-                         response_afterdelete.content)
+        response_before = self.client.get(reverse('posts:index'))
+        Post.objects.filter(pk=post.pk).update(text='Тихая правка поста')
+        response_silent_edit = self.client.get(reverse('posts:index'))
+        self.assertEqual(response_before.content,
+                         response_silent_edit.content)
         cache.clear()
         response_after_clear_cash = self.client.get(reverse('posts:index'))
-        self.assertNotEqual(response_afterdelete.content,
+        self.assertNotEqual(response_silent_edit.content,
                             response_after_clear_cash.content)
+        post.refresh_from_db()
+        post.text = 'Правка поста через сохранение'
+        post.save()
+        response_after_save = self.client.get(reverse('posts:index'))
+        self.assertContains(response_after_save, post.text)
+        post.delete()
+        response_after_delete = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response_after_delete, post.text)
 
     def test_subscriptions(self):
         """Проверка функции подписок. Авторизованный пользователь может
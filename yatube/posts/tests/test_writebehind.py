@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry
+from ..writebehind import apply_comments, drain, get_queue, timestamp
+
+User = get_user_model()
+
+
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.enterContext(self.settings(
+            POSTS_WRITE_BEHIND=True,
+            POSTS_WRITE_QUEUE=os.path.join(directory, 'writes.sqlite3')))
+        self.client.force_login(self.reader)
+
+    def test_comment_is_queued(self):
+        """Комментарий сначала попадает в очередь и виден только автору,
+        а после разбора очереди сохраняется со временем отправки.
+        """
+        address = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Отложенный комментарий'})
+        self.assertFalse(Comment.objects.exists())
+        self.assertContains(self.client.get(address),
+                            'Отложенный комментарий')
+        self.client.force_login(self.author)
+        self.assertNotContains(self.client.get(address),
+                               'Отложенный комментарий')
+        queued = get_queue().take(1)[0]
+        self.assertEqual(drain(), 1)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.author, self.reader)
+        self.assertEqual(comment.created, timestamp(queued[-1]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(get_queue().count(), 0)
+        self.assertContains(self.client.get(address),
+                            'Отложенный комментарий')
+
+    def test_replayed_comments_skipped(self):
+        """Повторное применение пачки после сбоя не дублирует
+        комментарии.
+        """
+        self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        writes = get_queue().take(10)
+        apply_comments(writes)
+        apply_comments(writes)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_follow_is_queued(self):
+        """Подписка видна подписчику сразу, а после разбора очереди
+        обновляет счетчик и ленту.
+        """
+        profile = reverse('posts:profile', args=['author'])
+        self.client.get(reverse('posts:profile_follow', args=['author']))
+        self.assertFalse(Follow.objects.exists())
+        self.assertTrue(self.client.get(profile).context['following'])
+        drain()
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author).followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post).exists())
+        self.client.get(reverse('posts:profile_unfollow', args=['author']))
+        self.assertFalse(self.client.get(profile).context['following'])
+        drain()
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(AuthorStats.objects.get(
+            user=self.author).followers_count, 0)
+
+    def test_last_write_wins(self):
+        """Из подписки и отписки в одной пачке остается последняя."""
+        for name in ('profile_follow', 'profile_unfollow', 'profile_follow',
+                     'profile_unfollow'):
+            self.client.get(reverse(f'posts:{name}', args=['author']))
+        with self.assertNumQueries(4):
+            drain()
+        self.assertFalse(Follow.objects.exists())
+
+    def test_drain_command(self):
+        """Команда разбирает очередь пачками до конца."""
+        for num in range(5):
+            self.client.post(
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': f'Комментарий {num}'})
+        call_command('drain_writes', batch_size=2, stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(list(Comment.objects.values_list(
+            'text', flat=True)), [f'Комментарий {num}' for num in range(5)])
@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Adds assertMaxQueries to a TestCase. Unlike assertNumQueries it
+    fails only when a view issues more queries than its budget, which is
+    enough to catch N+1 regressions.
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, num, msg=None):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > num:
+            queries = '\n'.join(
+                query['sql'] for query in context.captured_queries)
+            self.fail(msg or (
+                f'{executed} queries executed, at most {num} expected:\n'
+                f'{queries}'))
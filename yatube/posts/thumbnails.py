@@ -0,0 +1,66 @@
+import json
+
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+
+from .conditional import expire_post_pages
+from .fragments import bump_version
+from .models import Post
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_FORMATS = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+def available_formats():
+    return [image_format for image_format in VARIANT_FORMATS
+            if image_format != 'WEBP' or features.check('webp')]
+
+
+def make_variants(image):
+    """Render the image in every width of VARIANT_WIDTHS and every format
+    Pillow can write. Returns the manifest: srcset by MIME type, the
+    preferred format first.
+    """
+    width, height = map(int, THUMBNAIL_GEOMETRY.split('x'))
+    manifest = {}
+    for image_format in available_formats():
+        srcset = []
+        for variant_width in VARIANT_WIDTHS:
+            geometry = '{}x{}'.format(
+                variant_width, round(height * variant_width / width))
+            variant = get_thumbnail(image, geometry, format=image_format,
+                                    **THUMBNAIL_OPTIONS)
+            srcset.append(f'{variant.url} {variant_width}w')
+        manifest[VARIANT_FORMATS[image_format]] = ', '.join(srcset)
+    return manifest
+
+
+def make_thumbnail(post):
+    """Render the thumbnail and the responsive variants of the post image
+    and store their URLs. The post is updated only if its image has not
+    been replaced in the meantime.
+    """
+    thumbnail = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+    variants = make_variants(post.image)
+    updated = Post.objects.filter(pk=post.pk, image=post.image.name).update(
+        thumbnail=thumbnail.url, image_variants=json.dumps(variants))
+    if updated:
+        bump_version('post', post.pk)
+        expire_post_pages(post)
+    return thumbnail.url
+
+
+@task
+def render_thumbnail(post_id):
+    """Make the thumbnail of the post, if it still has an image. With
+    TASKS_BACKGROUND the run_tasks worker does it, so that the request
+    does not wait for Pillow, and pages show a placeholder meanwhile.
+    """
+    post = Post.objects.filter(pk=post_id).exclude(image='').first()
+    if post is not None:
+        make_thumbnail(post)
@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+FANOUT_BATCH_SIZE = 500
+
+
+def fanout_threshold():
+    return getattr(settings, 'POSTS_FANOUT_THRESHOLD', 1000)
+
+
+def is_popular(author):
+    """Posts of authors with more followers than POSTS_FANOUT_THRESHOLD are
+    not copied to the followers timelines, they are pulled at read time.
+    """
+    return AuthorStats.objects.filter(
+        user_id=author.pk,
+        followers_count__gt=fanout_threshold(),
+    ).exists()
+
+
+def fan_out_post(post):
+    """Push a new post to the timelines of all followers of its author."""
+    if is_popular(post.author):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(posts):
+    """Push many new posts to the timelines of their authors' followers,
+    with a couple of queries per author instead of per post.
+    """
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.author_id, []).append(post)
+    popular = set(AuthorStats.objects.filter(
+        user_id__in=by_author,
+        followers_count__gt=fanout_threshold(),
+    ).values_list('user_id', flat=True))
+    for author_id, author_posts in by_author.items():
+        if author_id in popular:
+            continue
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        TimelineEntry.objects.bulk_create(
+            (TimelineEntry(user_id=user_id, post=post,
+                           pub_date=post.pub_date)
+             for user_id in followers.iterator() for post in author_posts),
+            batch_size=FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def backfill_timeline(user, author):
+    """Copy existing posts of a newly followed author to user's timeline."""
+    if is_popular(author):
+        return
+    posts = Post.objects.filter(author=author).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()],
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def left_popular(author_id):
+    """Whether the author has just dropped to POSTS_FANOUT_THRESHOLD
+    followers. Followers are lost one by one, so the count passes the
+    threshold on its way down.
+    """
+    return AuthorStats.objects.filter(
+        user_id=author_id, followers_count=fanout_threshold()).exists()
+
+
+def fan_out_author(author_id):
+    """Push all posts of an author who is no longer popular to the
+    timelines of all followers. Posts written and follows made while the
+    author was popular were not fanned out, and the feeds stop pulling
+    them in at read time.
+    """
+    if AuthorStats.objects.filter(
+            user_id=author_id,
+            followers_count__gt=fanout_threshold()).exists():
+        return
+    followers = list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    posts = list(Post.objects.filter(
+        author_id=author_id).values_list('id', 'pub_date'))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for user_id in followers for post_id, pub_date in posts),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_timeline(user_id, author_id):
+    """Remove posts of an unfollowed author from user's timeline."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def timeline_posts(user):
+    """Return QuerySet of posts in user's follow feed. Usually it is a slice
+    of the precomputed timeline read in the order of its index. Posts of
+    followed popular authors are never fanned out and have to be merged in,
+    which costs an extra sort. Posts are annotated with timeline_date and
+    timeline_post, which cursor pagination can follow along the timeline
+    index.
+    """
+    popular = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=fanout_threshold(),
+    ).values('author_id')
+    if not popular.exists():
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            timeline_date=F('timeline_entries__pub_date'),
+            timeline_post=F('timeline_entries__post'),
+        ).order_by('-timeline_date', '-timeline_post')
+    return Post.objects.filter(
+        Q(id__in=TimelineEntry.objects.filter(
+            user=user).values('post_id'))
+        | Q(author__in=popular)).annotate(
+        timeline_date=F('pub_date'), timeline_post=F('id'))
@@ -0,0 +1,344 @@
+import csv
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .conditional import ALL_PAGES, touch_version
+from .counters import recount_authors, recount_posts
+from .groupfeed import expire_group_feeds
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .search import get_search_backend
+from .timeline import backfill_timeline, fan_out_posts
+
+User = get_user_model()
+
+TRANSFER_BATCH_SIZE = 1000
+COPY_WORKERS = 8
+# bulk_update() builds a CASE over the batch, which gets slow when long.
+UPDATE_BATCH_SIZE = 100
+FORMATS = ('jsonl', 'csv')
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+
+# Records of every kind in the order they depend on each other: record
+# type and (name, lookup) of the exported values. Users, groups and posts
+# are referred to by username, slug and the exported post id.
+EXPORTS = (
+    ('users', 'user', User, (
+        ('username', 'username'), ('first_name', 'first_name'),
+        ('last_name', 'last_name'), ('email', 'email'),
+        ('date_joined', 'date_joined'))),
+    ('groups', 'group', Group, (
+        ('slug', 'slug'), ('title', 'title'),
+        ('description', 'description'))),
+    ('posts', 'post', Post, (
+        ('id', 'id'), ('author', 'author__username'),
+        ('group', 'group__slug'), ('text', 'text'),
+        ('pub_date', 'pub_date'), ('image', 'image'))),
+    ('comments', 'comment', Comment, (
+        ('post', 'post_id'), ('author', 'author__username'),
+        ('text', 'text'), ('created', 'created'))),
+    ('follows', 'follow', Follow, (
+        ('user', 'user__username'), ('author', 'author__username'))),
+)
+# A CSV file holds records of every kind, so it has the columns of all.
+CSV_FIELDS = ('type', *dict.fromkeys(
+    name for *_, columns in EXPORTS for name, _ in columns))
+
+
+def batches(iterable, size):
+    """Yield lists of up to size items of iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def record_writer(stream, fmt):
+    """Return a function writing a record dict to a text stream."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, CSV_FIELDS, restval='')
+        writer.writeheader()
+        return writer.writerow
+    return lambda record: stream.write(
+        json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def read_records(stream, fmt):
+    """Yield record dicts from a text stream one by one. Empty CSV cells
+    are left out, like null values of JSON lines.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {name: value for name, value in row.items() if value}
+        return
+    for line in stream:
+        if line.strip():
+            yield {name: value for name, value in json.loads(line).items()
+                   if value is not None}
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_image(name, media_dir):
+    """Copy an image from the storage to media_dir, return whether it was
+    found.
+    """
+    target = os.path.join(media_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        with default_storage.open(name, 'rb') as source, \
+                open(target, 'wb') as copy:
+            shutil.copyfileobj(source, copy)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def import_image(name, media_dir):
+    """Save an image from media_dir to the storage unless it is already
+    there, return its name in the storage.
+    """
+    source = os.path.join(media_dir, name)
+    if default_storage.exists(name) or not os.path.exists(source):
+        return name
+    with open(source, 'rb') as file:
+        return default_storage.save(name, File(file))
+
+
+def export_data(stream, fmt='jsonl', kinds=KINDS,
+                chunk_size=TRANSFER_BATCH_SIZE, media_dir=None,
+                workers=COPY_WORKERS, progress=None):
+    """Write records of the given kinds to a text stream, reading rows from
+    the database chunk_size at a time. Images of posts are copied to
+    media_dir by a pool of threads while the next chunk is read. Returns
+    the numbers of written records and copied images.
+    """
+    progress = progress or (lambda message: None)
+    write = record_writer(stream, fmt)
+    counts = {}
+    with ThreadPoolExecutor(workers) as executor:
+        copying = []
+        for kind, record_type, model, columns in EXPORTS:
+            if kind not in kinds:
+                continue
+            names = [name for name, _ in columns]
+            rows = model.objects.order_by('pk').values_list(
+                *(lookup for _, lookup in columns)).iterator(
+                chunk_size=chunk_size)
+            counts[kind] = 0
+            for batch in batches(rows, chunk_size):
+                images = []
+                for row in batch:
+                    record = dict(zip(names, map(encode, row)))
+                    write({'type': record_type, **record})
+                    if record.get('image'):
+                        images.append(record['image'])
+                if media_dir is not None and images:
+                    copying.append(executor.map(
+                        partial(export_image, media_dir=media_dir), images))
+                counts[kind] += len(batch)
+                progress(f'{kind.capitalize()}: {counts[kind]}')
+        if media_dir is not None:
+            counts['images'] = sum(sum(copied) for copied in copying)
+    return counts
+
+
+def restore_dates(model, objects, dates, field):
+    """bulk_create() stamps auto_now_add fields with the current time, put
+    the imported dates back.
+    """
+    changed = []
+    for obj, value in zip(objects, dates):
+        if value is not None:
+            setattr(obj, field, value)
+            changed.append(obj)
+    model.objects.bulk_update(changed, [field], batch_size=UPDATE_BATCH_SIZE)
+
+
+class Importer:
+    """Insert records read by read_records() in batches of batch_size rows
+    of one kind, each batch in its own transaction. Records may only
+    refer to users, groups and posts imported before them or already in
+    the database; other records are skipped.
+
+    bulk_create() sends no signals, so everything they maintain is done
+    per batch: author and comment counters, timelines and the search
+    index. Only a mapping of exported post ids to new ones is kept for
+    the whole import.
+    """
+
+    def __init__(self, batch_size=TRANSFER_BATCH_SIZE, media_dir=None,
+                 executor=None, progress=None):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.executor = executor
+        self.progress = progress or (lambda message: None)
+        self.post_ids = {}
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.counts['skipped'] = 0
+        self.handlers = {
+            'user': ('users', self.import_users),
+            'group': ('groups', self.import_groups),
+            'post': ('posts', self.import_posts),
+            'comment': ('comments', self.import_comments),
+            'follow': ('follows', self.import_follows),
+        }
+        self.batch_type = None
+        self.batch = []
+
+    def add(self, record):
+        record_type = record.get('type')
+        if record_type not in self.handlers:
+            raise ValueError(f'Unknown record type {record_type!r}.')
+        if record_type != self.batch_type:
+            self.flush()
+            self.batch_type = record_type
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        kind, handler = self.handlers[self.batch_type]
+        imported = handler(self.batch)
+        self.counts[kind] += imported
+        self.counts['skipped'] += len(self.batch) - imported
+        self.batch = []
+        self.progress(f'{kind.capitalize()}: {self.counts[kind]}')
+
+    def finish(self):
+        self.flush()
+        touch_version(*ALL_PAGES)
+        return self.counts
+
+    def user_ids(self, usernames):
+        return dict(User.objects.filter(username__in=set(usernames))
+                    .values_list('username', 'pk'))
+
+    def import_users(self, batch):
+        users = []
+        for record in batch:
+            user = User(username=record['username'],
+                        first_name=record.get('first_name', ''),
+                        last_name=record.get('last_name', ''),
+                        email=record.get('email', ''), password='!')
+            if 'date_joined' in record:
+                user.date_joined = parse_datetime(record['date_joined'])
+            users.append(user)
+        with transaction.atomic():
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            AuthorStats.objects.bulk_create(
+                [AuthorStats(user_id=pk) for pk in self.user_ids(
+                    user.username for user in users).values()],
+                ignore_conflicts=True)
+        return len(batch)
+
+    def import_groups(self, batch):
+        with transaction.atomic():
+            Group.objects.bulk_create(
+                [Group(slug=record['slug'], title=record.get('title', ''),
+                       description=record.get('description', ''))
+                 for record in batch],
+                ignore_conflicts=True)
+        return len(batch)
+
+    def import_posts(self, batch):
+        authors = self.user_ids(record['author'] for record in batch)
+        groups = dict(Group.objects.filter(
+            slug__in={record.get('group') for record in batch})
+            .values_list('slug', 'pk'))
+        batch = [record for record in batch if record['author'] in authors]
+        images = [record.get('image', '') for record in batch]
+        if self.media_dir is not None and any(images):
+            # Files are copied before the transaction is opened.
+            images = list(self.executor.map(
+                partial(import_image, media_dir=self.media_dir), images))
+        posts = [Post(text=record['text'],
+                      author_id=authors[record['author']],
+                      group_id=groups.get(record.get('group')),
+                      image=image)
+                 for record, image in zip(batch, images)]
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            restore_dates(Post, posts, [
+                parse_datetime(record['pub_date'])
+                if 'pub_date' in record else None for record in batch],
+                'pub_date')
+            recount_authors(AuthorStats.objects.filter(
+                user_id__in={post.author_id for post in posts}))
+            fan_out_posts(posts)
+            get_search_backend().index_many(posts)
+        expire_group_feeds({post.group_id for post in posts} - {None})
+        for record, post in zip(batch, posts):
+            if 'id' in record:
+                self.post_ids[int(record['id'])] = post.pk
+        return len(posts)
+
+    def import_comments(self, batch):
+        authors = self.user_ids(record['author'] for record in batch)
+        batch = [record for record in batch
+                 if record['author'] in authors
+                 and int(record['post']) in self.post_ids]
+        comments = [Comment(text=record['text'],
+                            post_id=self.post_ids[int(record['post'])],
+                            author_id=authors[record['author']])
+                    for record in batch]
+        with transaction.atomic():
+            Comment.objects.bulk_create(comments)
+            restore_dates(Comment, comments, [
+                parse_datetime(record['created'])
+                if 'created' in record else None for record in batch],
+                'created')
+            recount_posts(Post.objects.filter(
+                pk__in={comment.post_id for comment in comments}))
+        return len(comments)
+
+    def import_follows(self, batch):
+        users = self.user_ids(
+            name for record in batch
+            for name in (record['user'], record['author']))
+        pairs = {(users[record['user']], users[record['author']])
+                 for record in batch
+                 if record['user'] in users and record['author'] in users
+                 and record['user'] != record['author']}
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                [Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in pairs],
+                ignore_conflicts=True)
+            recount_authors(AuthorStats.objects.filter(
+                user_id__in={author_id for _, author_id in pairs}))
+            for user_id, author_id in pairs:
+                backfill_timeline(User(pk=user_id), User(pk=author_id))
+        return len(pairs)
+
+
+def import_data(stream, fmt='jsonl', batch_size=TRANSFER_BATCH_SIZE,
+                media_dir=None, workers=COPY_WORKERS, progress=None):
+    """Import records written by export_data() from a text stream in
+    constant memory, apart from the post id mapping. Images are copied
+    from media_dir to the storage by a pool of threads. Returns the
+    numbers of imported and skipped records.
+    """
+    with ThreadPoolExecutor(workers) as executor:
+        importer = Importer(batch_size, media_dir, executor, progress)
+        for record in read_records(stream, fmt):
+            importer.add(record)
+        return importer.finish()
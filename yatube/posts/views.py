@@ -1,17 +1,39 @@
+import json
+from itertools import islice
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.db.replicas import replica_reads
+
+from .conditional import (conditional_page, group_scopes, index_scopes,
+                          post_scopes, profile_scopes)
+from .counters import author_stats
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .groupfeed import get_group, get_group_feed
+from .models import Follow, Post
+from .pagination import CountedPaginator, CursorPage, CursorPaginator
+from .search import search_posts
+from .thumbnails import render_thumbnail
+from .timeline import timeline_posts
+from .writebehind import (enqueue_comment, enqueue_follow, pending_comments,
+                          pending_following, write_behind_enabled)
 
 User = get_user_model()
 NUM_POSTS_PER_PAGE = 7
+EXPORT_CHUNK_SIZE = 500
 
 
+@replica_reads
+@conditional_page(index_scopes)
 def index(request):
-    post_list = Post.objects.all().select_related('author', 'group')
+    post_list = Post.objects.for_feed()
     page_obj = make_pages(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -19,10 +41,14 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = make_pages(request, post_list)
+    group = get_group(slug)
+    feed = get_group_feed(group)
+    post_list = group.posts.for_feed()
+    page_obj = make_pages(request, post_list, count=feed.count,
+                          newest_ids=feed.ids)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -30,13 +56,20 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    posts_count = author.posts.count()
-    following = (request.user.is_authenticated
-                 and author.following.filter(user=request.user).exists())
-    page_obj = make_pages(request, post_list)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    post_list = author.posts.for_feed()
+    posts_count = author_stats(author).posts_count
+    following = None
+    if write_behind_enabled():
+        following = pending_following(request.user, author)
+    if following is None:
+        following = (request.user.is_authenticated
+                     and author.following.filter(user=request.user).exists())
+    page_obj = make_pages(request, post_list, count=posts_count)
     context = {
         'author': author,
         'page_obj': page_obj,
@@ -46,12 +79,49 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(profile_scopes)
+def profile_export(request, username):
+    """All posts of the user as one JSON document, streamed while the rows
+    are read from the database cursor.
+    """
+    author = get_object_or_404(User, username=username)
+    rows = author.posts.values_list(
+        'id', 'text', 'pub_date', 'group__slug', 'image',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return StreamingHttpResponse(
+        stream_posts_json(author, rows), content_type='application/json')
+
+
+def stream_posts_json(author, rows):
+    """Yield a JSON document with the posts of author, EXPORT_CHUNK_SIZE
+    posts per chunk.
+    """
+    yield '{"author": %s, "posts": [' % json.dumps(author.username)
+    separator = ''
+    while True:
+        chunk = []
+        for pk, text, pub_date, group, image in islice(
+                rows, EXPORT_CHUNK_SIZE):
+            chunk.append(separator + json.dumps({
+                'id': pk,
+                'text': text,
+                'pub_date': pub_date,
+                'group': group,
+                'image': default_storage.url(image) if image else None,
+            }, cls=DjangoJSONEncoder, ensure_ascii=False))
+            separator = ',\n'
+        if not chunk:
+            break
+        yield ''.join(chunk)
+    yield ']}\n'
+
+
+@replica_reads
 def search(request):
     keyword = request.GET.get("q", None)
     if keyword:
-        post_list = Post.objects.filter(text__iregex=keyword).select_related(
-            'author', 'group')
-        page_obj = make_pages(request, post_list)
+        post_list = search_posts(Post.objects.for_feed(), keyword)
+        page_obj = make_pages(request, post_list, cursor=False)
     else:
         page_obj = None
     context = {
@@ -61,10 +131,14 @@ def search(request):
     return render(request, "posts/search.html", context)
 
 
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related(
-        'author', 'group'), id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'), id=post_id)
+    author_stats(post.author)
     comment_list = post.comments.all().select_related('author')
+    if write_behind_enabled():
+        comment_list = [*comment_list, *pending_comments(post, request.user)]
     form = CommentForm(request.POST or None)
     author = request.user.id == post.author.id
     context = {
@@ -83,6 +157,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            render_thumbnail.enqueue(post.pk)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -98,7 +174,13 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        image_changed = 'image' in form.changed_data
+        post = form.save(commit=False)
+        if image_changed:
+            post.thumbnail = post.image_variants = ''
+        post.save()
+        if image_changed and post.image:
+            render_thumbnail.enqueue(post.pk)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -120,18 +202,23 @@ def post_delete(request, post_id):
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = get_object_or_404(Post, id=post_id)
-        comment.save()
+        post = get_object_or_404(Post, id=post_id)
+        if write_behind_enabled():
+            enqueue_comment(post, request.user, form.cleaned_data['text'])
+        else:
+            comment = form.save(commit=False)
+            comment.author = request.user
+            comment.post = post
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    post_list = Post.objects.select_related(
-        "author", "group").filter(author__following__user=request.user)
-    page_obj = make_pages(request, post_list)
+    post_list = timeline_posts(request.user).for_feed()
+    page_obj = make_pages(request, post_list, field='timeline_date',
+                          tiebreak='timeline_post')
     context = {
         'page_obj': page_obj,
     }
@@ -142,23 +229,67 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        if write_behind_enabled():
+            enqueue_follow(request.user, author)
+        else:
+            Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    if write_behind_enabled():
+        enqueue_follow(request.user, author, follow=False)
+    else:
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
 
 
-def make_pages(request, post_list, per_page=NUM_POSTS_PER_PAGE):
+def make_pages(request, post_list, per_page=NUM_POSTS_PER_PAGE,
+               cursor=None, count=None, newest_ids=None, field='pub_date',
+               tiebreak='id'):
     """Split the QuerySet result to a pages with the specified number of posts
     per page. The number of posts per page could be provided during a function
     call. As a default the number of posts is taken from a constant
     NUM_POSTS_PER_PAGE. Returns page with a specified number of posts.
+
+    With cursor=True (or POSTS_CURSOR_PAGINATION setting when cursor is not
+    given) the page is located by an opaque ?cursor= token instead of
+    a page number, see posts.pagination.CursorPaginator. A known total
+    number of posts can be passed as count to save the COUNT(*) query.
+    Numbered pages link to the pages around the current one only, listed
+    in their page_range attribute.
+
+    newest_ids are ids of the newest posts of post_list in order, e.g.
+    from posts.groupfeed; the pages they cover are fetched with in_bulk().
+    field and tiebreak are the columns cursor pages are ordered by.
     """
-    paginator = Paginator(post_list, per_page)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if cursor is None:
+        cursor = getattr(settings, 'POSTS_CURSOR_PAGINATION', False)
+    if cursor:
+        token = request.GET.get('cursor')
+        if token or newest_ids is None or len(newest_ids) <= per_page:
+            return CursorPaginator(
+                post_list, per_page, field, tiebreak).get_page(token)
+        return CursorPage(
+            in_order(post_list, newest_ids[:per_page]), None, True, False)
+    if count is not None:
+        paginator = CountedPaginator(post_list, per_page, count)
+    else:
+        paginator = Paginator(post_list, per_page)
+    page = paginator.get_page(request.GET.get('page'))
+    page.page_range = list(paginator.get_elided_page_range(page.number))
+    bottom = (page.number - 1) * per_page
+    if newest_ids is not None and (
+            bottom + per_page <= len(newest_ids)
+            or len(newest_ids) == paginator.count):
+        page.object_list = in_order(
+            post_list, newest_ids[bottom:bottom + per_page])
+    return page
+
+
+def in_order(post_list, ids):
+    """Posts of post_list with the ids in the order of the ids."""
+    posts = post_list.in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,216 @@
+import os
+import time
+from datetime import datetime, timezone
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from core.db.replicas import pin_to_primary
+from core.sqlitefile import LocalSQLiteFile
+
+from .conditional import touch_version
+from .counters import recount_authors, recount_posts
+from .models import AuthorStats, Comment, Follow, Post
+from .timeline import backfill_timeline
+from .transfer import restore_dates
+
+User = get_user_model()
+
+WRITE_BATCH_SIZE = 500
+KINDS = ('comment', 'follow', 'unfollow')
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS writes ('
+    'id INTEGER PRIMARY KEY, kind TEXT NOT NULL, user_id INTEGER NOT NULL, '
+    'target INTEGER NOT NULL, text TEXT, created REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS writes_user ON writes (user_id, target)',
+)
+
+
+def write_behind_enabled():
+    return getattr(settings, 'POSTS_WRITE_BEHIND', False)
+
+
+def queue_path():
+    return getattr(settings, 'POSTS_WRITE_QUEUE',
+                   os.path.join(settings.BASE_DIR, 'writes.sqlite3'))
+
+
+class WriteQueue(LocalSQLiteFile):
+    """Comments, follows and unfollows waiting to be written to the
+    database, kept in a file of the host. target is the id of the post
+    for comments and of the author otherwise.
+    """
+    schema = SCHEMA
+
+    def push(self, kind, user_id, target, text=None):
+        if kind not in KINDS:
+            raise ValueError(f'Unknown write {kind!r}.')
+        return self.connection.execute(
+            'INSERT INTO writes (kind, user_id, target, text, created) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (kind, user_id, target, text, time.time())).lastrowid
+
+    def take(self, limit):
+        """Oldest queued writes as (id, kind, user_id, target, text,
+        created) rows. They stay queued until delete() is called.
+        """
+        return self.connection.execute(
+            'SELECT id, kind, user_id, target, text, created FROM writes '
+            'ORDER BY id LIMIT ?', (limit,)).fetchall()
+
+    def delete(self, ids):
+        with self.transaction() as connection:
+            connection.executemany(
+                'DELETE FROM writes WHERE id = ?', [(pk,) for pk in ids])
+
+    def pending(self, user_id, target):
+        """Queued writes of the user to the post or the author."""
+        return self.connection.execute(
+            'SELECT id, kind, user_id, target, text, created FROM writes '
+            'WHERE user_id = ? AND target = ? ORDER BY id',
+            (user_id, target)).fetchall()
+
+    def count(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM writes').fetchone()[0]
+
+
+def get_queue():
+    return WriteQueue.load(queue_path())
+
+
+def timestamp(created):
+    return datetime.fromtimestamp(created, timezone.utc)
+
+
+def enqueue_comment(post, user, text):
+    get_queue().push('comment', user.pk, post.pk, text)
+    touch_version('post_page', post.pk)
+    pin_to_primary()
+
+
+def enqueue_follow(user, author, follow=True):
+    get_queue().push('follow' if follow else 'unfollow', user.pk, author.pk)
+    touch_version('profile_page', author.username)
+    pin_to_primary()
+
+
+def pending_comments(post, user):
+    """Unsaved comments of user on post still waiting in the queue, shown
+    to their author after the saved ones.
+    """
+    if not user.is_authenticated:
+        return []
+    return [Comment(post=post, author=user, text=text,
+                    created=timestamp(created))
+            for _, kind, _, _, text, created in get_queue().pending(
+                user.pk, post.pk) if kind == 'comment']
+
+
+def pending_following(user, author):
+    """Whether user follows author according to the queued follows and
+    unfollows, None when there are none.
+    """
+    if not user.is_authenticated:
+        return None
+    kinds = [kind for _, kind, *_ in get_queue().pending(user.pk, author.pk)
+             if kind != 'comment']
+    if not kinds:
+        return None
+    return kinds[-1] == 'follow'
+
+
+def apply_comments(writes):
+    """Insert the queued comments of existing posts and users. A batch
+    applied again after a crash between the commit and the removal from
+    the queue finds its comments by post, author and time and skips them.
+    """
+    if not writes:
+        return 0
+    posts = set(Post.objects.filter(
+        pk__in={target for _, _, _, target, _, _ in writes}).values_list(
+        'pk', flat=True))
+    users = set(User.objects.filter(
+        pk__in={user_id for _, _, user_id, *_ in writes}).values_list(
+        'pk', flat=True))
+    writes = [write for write in writes
+              if write[3] in posts and write[2] in users]
+    dates = [timestamp(created) for *_, created in writes]
+    saved = set(Comment.objects.filter(
+        post_id__in={write[3] for write in writes},
+        created__in=dates).values_list('post_id', 'author_id', 'created'))
+    comments = []
+    created = []
+    for (_, _, user_id, post_id, text, _), date in zip(writes, dates):
+        if (post_id, user_id, date) not in saved:
+            comments.append(
+                Comment(post_id=post_id, author_id=user_id, text=text))
+            created.append(date)
+    Comment.objects.bulk_create(comments)
+    restore_dates(Comment, comments, created, 'created')
+    post_ids = {comment.post_id for comment in comments}
+    recount_posts(Post.objects.filter(pk__in=post_ids))
+    for post_id in post_ids:
+        touch_version('post_page', post_id)
+    return len(comments)
+
+
+def apply_follows(writes):
+    """Bring follows to the state of the last queued write of every pair
+    of users: create the missing ones with bulk_create and delete the
+    rest with one query.
+    """
+    if not writes:
+        return 0
+    last = {}
+    for _, kind, user_id, author_id, _, _ in writes:
+        if user_id != author_id:
+            last[(user_id, author_id)] = kind
+    users = set(User.objects.filter(
+        pk__in={pk for pair in last for pk in pair}).values_list(
+        'pk', flat=True))
+    follows = {pair for pair, kind in last.items()
+               if kind == 'follow' and set(pair) <= users}
+    unfollows = {pair for pair, kind in last.items() if kind == 'unfollow'}
+    existing = set(Follow.objects.filter(
+        user_id__in={user_id for user_id, _ in follows},
+        author_id__in={author_id for _, author_id in follows},
+    ).values_list('user_id', 'author_id'))
+    created = follows - existing
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in created], ignore_conflicts=True)
+    authors = {author_id for _, author_id in created}
+    recount_authors(AuthorStats.objects.filter(user_id__in=authors))
+    for user_id, author_id in created:
+        backfill_timeline(User(pk=user_id), User(pk=author_id))
+    for username in User.objects.filter(pk__in=authors).values_list(
+            'username', flat=True):
+        touch_version('profile_page', username)
+    deleted = 0
+    if unfollows:
+        # delete() sends post_delete, whose receivers update the counters,
+        # timelines and page versions.
+        deleted = Follow.objects.filter(reduce(or_, (
+            Q(user_id=user_id, author_id=author_id)
+            for user_id, author_id in unfollows))).delete()[0]
+    return len(created) + deleted
+
+
+def drain(queue=None, batch_size=WRITE_BATCH_SIZE):
+    """Apply one batch of the oldest queued writes in a transaction and
+    remove them from the queue. Returns the number of taken writes.
+    """
+    queue = queue or get_queue()
+    writes = queue.take(batch_size)
+    if not writes:
+        return 0
+    with transaction.atomic():
+        apply_comments([write for write in writes if write[1] == 'comment'])
+        apply_follows([write for write in writes if write[1] != 'comment'])
+    queue.delete([write[0] for write in writes])
+    return len(writes)
@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. The read-only pages are served by async views (see
+yatube.asgi_urls); the rest runs in the thread Django's handler starts
+for the synchronous code of each request. Database connections are not
+kept after a request by default, since such a thread never serves
+another one. Run it with any ASGI server, e.g.::
+
+    uvicorn yatube.asgi:application
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
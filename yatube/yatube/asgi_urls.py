@@ -0,0 +1,16 @@
+"""URL configuration of the requests served through ASGI, see
+core.asgi.ASGIURLconfMiddleware: yatube.urls with the read-only pages of
+posts answered by their async views.
+"""
+from django.urls import include, path
+
+from . import urls
+
+urlpatterns = [
+    path('', include('posts.async_urls', namespace='posts'))
+    if getattr(url, 'namespace', None) == 'posts' else url
+    for url in urls.urlpatterns
+]
+
+handler404 = urls.handler404
+handler403 = urls.handler403
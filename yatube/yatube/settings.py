@@ -4,10 +4,10 @@ Django settings for yatube project.
 Generated by 'django-admin startproject' using Django 2.2.19.
 
 For more information on this file, see
-https://docs.djangoproject.com/en/2.2/topics/settings/
+https://docs.djangoproject.com/en/5.2/topics/settings/
 
 For the full list of settings and their values, see
-https://docs.djangoproject.com/en/2.2/ref/settings/
+https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
@@ -17,7 +17,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 # Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = '13y7qqer_ewshoce(jv0mrj^t8igi6ipujv_&j2q7f-48-nhhx'
@@ -52,6 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.perf.PerformanceMiddleware',
+    'core.asgi.ASGIURLconfMiddleware',
+    'core.db.replicas.ReplicaMiddleware',
+    'core.pagecache.AnonymousPageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,20 +87,67 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+ASGI_APPLICATION = 'yatube.asgi.application'
+
+# Requests served through ASGI are resolved with these URLs, in which the
+# read-only pages are async views.
+ASGI_ROOT_URLCONF = 'yatube.asgi_urls'
 
-# Database
-# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+# core.db.sqlite3 sets WAL, mmap and busy timeout pragmas on connect and
+# retries writes while the database is locked. Transactions take the write
+# lock when they begin, so that concurrent writers wait for each other in
+# busy_timeout instead of failing on upgrading a read lock. Connections are
+# reused by the requests of a thread for CONN_MAX_AGE seconds. Under ASGI
+# the synchronous code of every request runs in a thread of its own, so
+# yatube.asgi makes DB_CONN_MAX_AGE default to 0 there.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'busy_retries': 3,
+        },
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read-only copies of the database, given as a comma separated list of
+# files in DB_REPLICAS and refreshed by the sync_replicas command. Views
+# marked with core.db.replicas.replica_reads read from a random replica
+# that was synced after the last write of the user.
+DATABASE_REPLICAS = []
+for num, path in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{num}'] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{num}')
+DATABASE_ROUTERS = ['core.db.replicas.ReplicaRouter']
+
+# Comments, follows and unfollows are put into a queue file and written
+# to the database in batches by the drain_writes command.
+POSTS_WRITE_BEHIND = os.getenv('POSTS_WRITE_BEHIND') == '1'
+POSTS_WRITE_QUEUE = os.path.join(BASE_DIR, 'writes.sqlite3')
+
+# Search indexing, timelines and thumbnails are done by the run_tasks
+# worker instead of the request, with tasks queued in TASKS_BROKER.
+TASKS_BACKGROUND = os.getenv('TASKS_BACKGROUND') == '1'
+TASKS_BROKER = os.path.join(BASE_DIR, 'tasks.sqlite3')
+
+# Integer primary keys, as created by the existing migrations
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
 
 # Password validation
-# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,7 +166,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 # Internationalization
-# https://docs.djangoproject.com/en/2.2/topics/i18n/
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
 
 LANGUAGE_CODE = 'ru'
 
@@ -123,13 +174,11 @@ TIME_ZONE = 'UTC'
 
 USE_I18N = True
 
-USE_L10N = True
-
 USE_TZ = True
 
 
 # Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/2.2/howto/static-files/
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
@@ -153,8 +202,72 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# Every worker keeps a small local LRU in front of the cache shared by all
+# workers of the host (SQLite file) or of the cluster (Redis, if REDIS_URL
+# is set).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 30,
+            'POLL_INTERVAL': 0.5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
+
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES['shared'] = {
+        'BACKEND': 'core.cache.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+
+# Keyset pagination of the feeds by (pub_date, id) instead of page numbers
+POSTS_CURSOR_PAGINATION = False
+
+
+# Posts of authors with more followers are not fanned out to the follow
+# timelines on write, they are merged into the follow feed on read
+POSTS_FANOUT_THRESHOLD = 1000
+
+
+# Lifetime of the cached rendered articles, they are invalidated on changes
+# of the post, its author or group anyway
+POSTS_FRAGMENT_TIMEOUT = 60 * 60
+
+
+# Number of the newest posts in the RSS and Atom feeds
+POSTS_FEED_SIZE = 50
+
+# Number of the newest post ids of every group kept in the cache, the
+# group pages they cover are read with a single query
+POSTS_GROUP_FEED_SIZE = 100
+
+
+# Share of requests instrumented by core.perf.PerformanceMiddleware: SQL,
+# templates and fragment cache timings, Server-Timing header
+PERF_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+# Addresses allowed to read /metrics/. Behind a reverse proxy on the same
+# host every request comes from 127.0.0.1, so none are allowed by default
+METRICS_ALLOWED_IPS = list(
+    filter(None, os.getenv('METRICS_ALLOWED_IPS', '').split(',')))
+# Token a scraper can send as "Authorization: Bearer <token>" instead
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+
+# Anonymous pages are kept by core.pagecache.AnonymousPageCacheMiddleware
+# until they change or for PAGE_CACHE_TIMEOUT seconds; a reverse proxy and
+# browsers may reuse them for PAGE_CACHE_MAX_AGE seconds
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_MAX_AGE = 60